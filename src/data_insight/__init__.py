@@ -18,13 +18,15 @@ from .data_insight_framework import (
     SmartLLMOptimizer,
     LocalLLMOptimizer
 )
+from .llm_cache import LLMCache
 
 __all__ = [
     'DataInsightFramework',
     'InsightResult', 
     'LLMOptimizer',
     'SmartLLMOptimizer',
-    'LocalLLMOptimizer'
+    'LocalLLMOptimizer',
+    'LLMCache'
 ]
 
 __version__ = '1.0.0' 
\ No newline at end of file
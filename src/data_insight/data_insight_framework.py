@@ -1,18 +1,30 @@
 import pandas as pd
 import numpy as np
+import io
+import asyncio
+import copy
+import functools
+import hashlib
+import operator
+import threading
 import warnings
 from typing import Dict, List, Tuple, Optional, Any, Union
 from dataclasses import dataclass, field
-from sklearn.neighbors import LocalOutlierFactor
-from sklearn.cluster import DBSCAN
-from scipy.stats import zscore, pearsonr, spearmanr
-from scipy.signal import find_peaks
-import pymannkendall as mk
-import ruptures as rpt
+from collections import OrderedDict
+from scipy import stats
+from scipy.stats import zscore, pearsonr, spearmanr, rankdata
+from joblib import Parallel, delayed
+# sklearn / ruptures / pymannkendall 在对应算法中按需导入，避免加载本模块时的启动开销
 from datetime import datetime
 import json
 import requests
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 from abc import ABC, abstractmethod
+from src.data_insight.llm_cache import LLMCache
 try:
     from src.llms.llm import get_llm_by_type
     from src.config.agents import AGENT_LLM_MAP
@@ -22,6 +34,9 @@ except ImportError:
     print("警告: 未找到LLM配置，将使用简化版本")
 warnings.filterwarnings('ignore')
 
+# 严重程度排序权重
+SEVERITY_RANK = {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}
+
 @dataclass
 class InsightResult:
     """数据洞察结果的标准化结构"""
@@ -31,8 +46,10 @@ class InsightResult:
     confidence: float  # 置信度 0-1
     description: str  # 洞察描述
     details: Dict[str, Any]  # 详细结果
-    affected_data: List[int] = field(default_factory=list)  # 受影响的数据索引
+    # 受影响的数据索引；ndarray 的 == 逐元素比较，不参与自动生成的 __eq__
+    affected_data: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32), compare=False)
     recommendations: List[str] = field(default_factory=list)  # 建议
+    column: Optional[str] = None  # 分析的列名，单列分析时填充
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -42,14 +59,31 @@ class InsightResult:
             'confidence': self.confidence,
             'description': self.description,
             'details': self.details,
-            'affected_data': self.affected_data,
-            'recommendations': self.recommendations
+            'affected_data': np.asarray(self.affected_data).tolist(),
+            'recommendations': self.recommendations,
+            'column': self.column
         }
     
+    @property
+    def severity_rank(self) -> int:
+        """严重程度的数值排序权重，未知等级为0"""
+        return SEVERITY_RANK.get(self.severity, 0)
+    
+    @functools.cached_property
+    def _cached_dict(self) -> Dict[str, Any]:
+        """缓存的字典形式，结果生成后视为不可变"""
+        return self.to_dict()
+    
     def to_friendly_description(self) -> str:
         """生成通俗易懂的描述"""
+        return self.friendly
+    
+    @functools.cached_property
+    def friendly(self) -> str:
+        """通俗易懂的描述（首次访问时生成并缓存）"""
         friendly_names = {
             'lof': '局部异常检测',
+            'iforest': '孤立森林异常检测',
             'zscore': '数值异常检测',
             'iqr': '四分位异常检测',
             'mann_kendall': '趋势分析',
@@ -95,44 +129,30 @@ class LLMOptimizer(ABC):
     def optimize_report(self, insights: List[InsightResult], context: str = "") -> str:
         """优化报告输出"""
         pass
+    
+    async def aoptimize_report(self, insights: List[InsightResult], context: str = "") -> str:
+        """异步优化报告输出，默认在线程池中执行同步实现"""
+        return await asyncio.to_thread(self.optimize_report, insights, context)
+    
+    def optimize_report_with_status(self, insights: List[InsightResult], context: str = "") -> Tuple[str, bool]:
+        """优化报告输出，并返回是否为大模型的真实输出；为False时是备用报告，不应缓存"""
+        return self.optimize_report(insights, context), True
+    
+    async def aoptimize_report_with_status(self, insights: List[InsightResult], context: str = "") -> Tuple[str, bool]:
+        """异步版本的 optimize_report_with_status，默认在线程池中执行同步实现"""
+        return await asyncio.to_thread(self.optimize_report_with_status, insights, context)
 
 class SmartLLMOptimizer(LLMOptimizer):
     """智能大模型优化器 - 使用项目配置的LLM"""
     
-    def __init__(self):
-        if HAS_LLM_CONFIG:
-            try:
-                self.llm = get_llm_by_type(AGENT_LLM_MAP.get("chatbot", "basic"))
-                self.has_llm = True
-            except Exception as e:
-                print(f"LLM初始化失败: {e}")
-                self.has_llm = False
-        else:
-            self.has_llm = False
-    
-    def optimize_report(self, insights: List[InsightResult], context: str = "") -> str:
-        """使用配置的LLM优化报告"""
-        if not self.has_llm:
-            return self._generate_fallback_report(insights, context)
-        
-        try:
-            # 准备洞察数据
-            insights_text = "\n".join([
-                f"- {insight.to_friendly_description()}\n  详情: {insight.details}\n  建议: {', '.join(insight.recommendations)}"
-                for insight in insights
-            ])
-            
-            prompt = f"""
-请将以下数据分析结果转换为通俗易懂的业务报告，面向非技术背景的业务人员：
-
-背景信息: {context}
+    # 固定的任务说明，作为所有请求的公共前缀
+    SYSTEM_PROMPT = """请将用户提供的数据分析结果转换为通俗易懂的业务报告，面向非技术背景的业务人员。
 
-数据洞察结果:
-{insights_text}
+用户消息包含背景信息和数据洞察结果。
 
 请按以下要求输出:
 1. 用简单易懂的语言解释发现的问题
-2. 说明这些问题对业务的潜在影响  
+2. 说明这些问题对业务的潜在影响
 3. 提供具体可行的改进建议
 4. 避免使用技术术语，多用比喻和实例
 5. 按重要性排序展示结果
@@ -143,12 +163,95 @@ class SmartLLMOptimizer(LLMOptimizer):
 - 突出关键信息
 - 语言亲和，便于理解
 """
-            response = self.llm.invoke(prompt)
-            return response.content if hasattr(response, 'content') else str(response)
-                
+    
+    def __init__(self, cache: Optional[LLMCache] = None):
+        self.cache = cache if cache is not None else LLMCache()
+        if HAS_LLM_CONFIG:
+            try:
+                llm = get_llm_by_type(AGENT_LLM_MAP.get("chatbot", "basic"))
+                # 报告生成使用确定性输出，响应才可缓存；复制实例以免修改共享的LLM
+                self.llm = llm.model_copy(update={"temperature": 0}) if hasattr(llm, "model_copy") else llm
+                self.has_llm = True
+            except Exception as e:
+                print(f"LLM初始化失败: {e}")
+                self.has_llm = False
+        else:
+            self.has_llm = False
+    
+    def _cache_key(self, prompt: Any) -> Optional[str]:
+        """按 (model, prompt, temperature) 计算缓存键，仅 temperature=0 时缓存"""
+        model = getattr(self.llm, 'model_name', None) or getattr(self.llm, 'model', None)
+        return LLMCache.cache_key(model, prompt, getattr(self.llm, 'temperature', None))
+    
+    def optimize_report(self, insights: List[InsightResult], context: str = "") -> str:
+        """使用配置的LLM优化报告"""
+        return self.optimize_report_with_status(insights, context)[0]
+    
+    async def aoptimize_report(self, insights: List[InsightResult], context: str = "") -> str:
+        """使用配置的LLM异步优化报告"""
+        return (await self.aoptimize_report_with_status(insights, context))[0]
+    
+    def optimize_report_with_status(self, insights: List[InsightResult], context: str = "") -> Tuple[str, bool]:
+        """使用配置的LLM优化报告，LLM不可用或调用失败时返回备用报告和False"""
+        if not self.has_llm:
+            return self._failure_report(insights, context)
+        
+        try:
+            prompt, cache_key, cached = self._prepare_request(insights, context)
+            if cached is not None:
+                return cached, True
+            return self._finish_request(cache_key, self.llm.invoke(prompt)), True
         except Exception as e:
-            print(f"大模型优化失败: {str(e)}")
-            return self._generate_fallback_report(insights, context)
+            return self._failure_report(insights, context, e)
+    
+    async def aoptimize_report_with_status(self, insights: List[InsightResult], context: str = "") -> Tuple[str, bool]:
+        """使用配置的LLM异步优化报告，LLM不可用或调用失败时返回备用报告和False"""
+        if not self.has_llm:
+            return self._failure_report(insights, context)
+        
+        try:
+            prompt, cache_key, cached = self._prepare_request(insights, context)
+            if cached is not None:
+                return cached, True
+            return self._finish_request(cache_key, await self.llm.ainvoke(prompt)), True
+        except Exception as e:
+            return self._failure_report(insights, context, e)
+    
+    def _prepare_request(self, insights: List[InsightResult], context: str) -> Tuple[Any, Optional[str], Optional[str]]:
+        """构建消息并查询响应缓存，返回 (消息, 缓存键, 缓存的报告)"""
+        prompt = self._build_prompt(insights, context)
+        cache_key = self._cache_key(prompt)
+        return prompt, cache_key, self.cache.get(cache_key)
+    
+    def _finish_request(self, cache_key: Optional[str], response: Any) -> str:
+        """提取LLM响应内容并写入缓存"""
+        content = response.content if hasattr(response, 'content') else str(response)
+        self.cache.set(cache_key, content)
+        return content
+    
+    def _failure_report(self, insights: List[InsightResult], context: str,
+                        error: Optional[Exception] = None) -> Tuple[str, bool]:
+        """LLM不可用或调用失败时返回备用报告"""
+        if error is not None:
+            print(f"大模型优化失败: {str(error)}")
+        return self._generate_fallback_report(insights, context), False
+    
+    def _build_prompt(self, insights: List[InsightResult], context: str = "") -> List[Tuple[str, str]]:
+        """构建报告优化消息
+
+        固定的任务说明放在最前面的system消息中，背景和洞察结果放在最后，
+        使各次请求共享相同的前缀，便于模型服务端的前缀缓存命中
+        """
+        # 准备洞察数据
+        insights_text = "\n".join([
+            f"- {insight.friendly}\n  详情: {insight.details}\n  建议: {', '.join(insight.recommendations)}"
+            for insight in insights
+        ])
+        
+        return [
+            ("system", self.SYSTEM_PROMPT),
+            ("human", f"背景信息: {context}\n\n数据洞察结果:\n{insights_text}")
+        ]
     
     def _generate_fallback_report(self, insights: List[InsightResult], context: str = "") -> str:
         """生成备用报告（不使用LLM）"""
@@ -158,7 +261,7 @@ class SmartLLMOptimizer(LLMOptimizer):
 📋 分析背景: {context}
 
 🔍 主要发现:
-{chr(10).join([f"• {insight.to_friendly_description()}" for insight in insights[:5]])}
+{chr(10).join([f"• {insight.friendly}" for insight in insights[:5]])}
 
 💡 关键建议:
 {chr(10).join([f"• {rec}" for insight in insights for rec in insight.recommendations[:2]][:5])}
@@ -169,31 +272,34 @@ class SmartLLMOptimizer(LLMOptimizer):
 class LocalLLMOptimizer(LLMOptimizer):
     """本地大模型优化器（支持Ollama等）"""
     
+    SYSTEM_PROMPT = "请将用户提供的数据分析结果转换为通俗易懂的业务报告。请用简单的语言解释这些发现，说明对业务的影响，并提供改进建议。避免技术术语，多用生活中的例子来解释。"
+    
     def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen2.5"):
         self.base_url = base_url
         self.model = model
     
     def optimize_report(self, insights: List[InsightResult], context: str = "") -> str:
         """使用本地大模型优化报告"""
+        return self.optimize_report_with_status(insights, context)[0]
+    
+    def optimize_report_with_status(self, insights: List[InsightResult], context: str = "") -> Tuple[str, bool]:
+        """使用本地大模型优化报告，调用失败时返回附带原始结果的错误说明和False"""
         try:
             insights_text = "\n".join([
-                f"- {insight.to_friendly_description()}\n  详情: {insight.details}\n  建议: {', '.join(insight.recommendations)}"
+                f"- {insight.friendly}\n  详情: {insight.details}\n  建议: {', '.join(insight.recommendations)}"
                 for insight in insights
             ])
             
-            prompt = f"""
-请将以下数据分析结果转换为通俗易懂的业务报告：
-
-背景: {context}
+            # 固定说明放在system中作为公共前缀，动态内容放在prompt末尾
+            prompt = f"""背景: {context}
 
 发现的问题:
 {insights_text}
-
-请用简单的语言解释这些发现，说明对业务的影响，并提供改进建议。避免技术术语，多用生活中的例子来解释。
 """
             
             payload = {
                 "model": self.model,
+                "system": self.SYSTEM_PROMPT,
                 "prompt": prompt,
                 "stream": False
             }
@@ -205,20 +311,29 @@ class LocalLLMOptimizer(LLMOptimizer):
             )
             
             if response.status_code == 200:
-                return response.json().get('response', '优化失败')
+                return response.json().get('response', '优化失败'), True
             else:
                 raise Exception(f"API调用失败: {response.status_code}")
                 
         except Exception as e:
             return f"本地大模型优化失败: {str(e)}\n\n原始报告:\n" + "\n".join([
-                insight.to_friendly_description() for insight in insights
-            ])
+                insight.friendly for insight in insights
+            ]), False
 
 class DataInsightFramework:
     """数据洞察框架 - 统一的数据分析工具"""
     
+    # analyze() 结果缓存：最多保留的条目数，以及参与缓存的数据大小上限
+    _ANALYZE_CACHE_SIZE = 64
+    _ANALYZE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+    # 大模型优化报告缓存条目数
+    _LLM_REPORT_CACHE_SIZE = 32
+    
     def __init__(self, llm_optimizer: Optional[LLMOptimizer] = None):
         self.results = []
+        self._analyze_cache = OrderedDict()
+        self._analyze_cache_lock = threading.Lock()
+        self._llm_report_cache = OrderedDict()
         self.llm_optimizer = SmartLLMOptimizer()
         
         # 算法配置
@@ -230,7 +345,11 @@ class DataInsightFramework:
             'dbscan_min_samples': 5,
             'correlation_threshold': 0.7,
             'cv_threshold': 0.3,
-            'trend_alpha': 0.05
+            'trend_alpha': 0.05,
+            'iforest_n_estimators': 100,
+            'iforest_max_samples': 256,
+            'iforest_quantile': 0.99,
+            'large_data_threshold': 10000
         }
     
     def clear_results(self):
@@ -257,6 +376,14 @@ class DataInsightFramework:
                     "建立异常监控机制"
                 ])
         
+        elif algorithm == 'iforest':
+            if details.get('outliers_count', 0) > 0:
+                recommendations.extend([
+                    "优先核查异常得分最高的数据点",
+                    "分析异常数据的共同特征",
+                    "建立异常监控机制"
+                ])
+        
         elif algorithm == 'mann_kendall':
             if details.get('trend') == 'increasing':
                 recommendations.extend([
@@ -313,6 +440,13 @@ class DataInsightFramework:
             else:
                 return "数据的局部密度正常，没有发现孤立异常"
         
+        elif algorithm == 'iforest':
+            outliers_count = details.get('outliers_count', 0)
+            if outliers_count > 0:
+                return f"通过孤立森林发现 {outliers_count} 个异常点，这些数据很容易与其他数据区分开"
+            else:
+                return "孤立森林未发现明显异常点"
+        
         elif algorithm == 'mann_kendall':
             trend = details.get('trend', 'no trend')
             p_value = details.get('p_value', 1.0)
@@ -385,7 +519,7 @@ class DataInsightFramework:
             confidence=confidence,
             description=description,
             details=details,
-            affected_data=outliers.tolist(),
+            affected_data=outliers.astype(np.int32, copy=False),
             recommendations=recommendations
         )
 
@@ -424,7 +558,7 @@ class DataInsightFramework:
             confidence=confidence,
             description=description,
             details=details,
-            affected_data=outliers.tolist(),
+            affected_data=outliers.astype(np.int32, copy=False),
             recommendations=recommendations
         )
 
@@ -433,6 +567,8 @@ class DataInsightFramework:
         if contamination is None:
             contamination = self.config['lof_contamination']
         
+        from sklearn.neighbors import LocalOutlierFactor
+        
         if len(data.shape) == 1:
             data = data.reshape(-1, 1)
         
@@ -460,7 +596,54 @@ class DataInsightFramework:
             confidence=confidence,
             description=description,
             details=details,
-            affected_data=outliers.tolist(),
+            affected_data=outliers.astype(np.int32, copy=False),
+            recommendations=recommendations
+        )
+
+    def analyze_isolation_forest(self, data: np.ndarray, quantile: float = None) -> InsightResult:
+        """孤立森林异常检测，适用于大规模数据的批量打分"""
+        if quantile is None:
+            quantile = self.config['iforest_quantile']
+        
+        from sklearn.ensemble import IsolationForest
+        
+        X = np.asarray(data, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+        
+        clf = IsolationForest(
+            n_estimators=self.config['iforest_n_estimators'],
+            max_samples=min(self.config['iforest_max_samples'], len(X)),
+            n_jobs=-1,
+            random_state=42
+        ).fit(X)
+        # 一次性对全部数据打分，得分越高越异常
+        scores = -clf.score_samples(X)
+        cutoff = float(np.quantile(scores, quantile))
+        outliers = np.flatnonzero(scores > cutoff)
+        
+        details = {
+            'quantile': quantile,
+            'score_cutoff': cutoff,
+            'outliers_count': len(outliers),
+            'outlier_indices': outliers.tolist(),
+            'max_score': float(scores.max())
+        }
+        
+        severity = 'high' if len(outliers) > len(X) * 0.1 else 'medium' if len(outliers) > 0 else 'low'
+        confidence = 0.85 if len(outliers) > 0 else 0.7
+        
+        description = self._create_friendly_description('iforest', details, severity)
+        recommendations = self._get_friendly_recommendations('iforest', details)
+        
+        return InsightResult(
+            algorithm='iforest',
+            insight_type='anomaly',
+            severity=severity,
+            confidence=confidence,
+            description=description,
+            details=details,
+            affected_data=outliers.astype(np.int32, copy=False),
             recommendations=recommendations
         )
 
@@ -469,6 +652,8 @@ class DataInsightFramework:
         if alpha is None:
             alpha = self.config['trend_alpha']
         
+        import pymannkendall as mk
+        
         result = mk.original_test(data, alpha=alpha)
         
         details = {
@@ -499,6 +684,8 @@ class DataInsightFramework:
     def analyze_page_hinkley(self, data: np.ndarray) -> InsightResult:
         """Page-Hinkley变化点检测"""
         try:
+            import ruptures as rpt
+            
             algo = rpt.Pelt(model="rbf").fit(data)
             change_points = algo.predict(pen=10)
             
@@ -534,7 +721,7 @@ class DataInsightFramework:
                 confidence=confidence,
                 description=description,
                 details=details,
-                affected_data=change_points,
+                affected_data=np.asarray(change_points, dtype=np.int32),
                 recommendations=recommendations
             )
         except Exception as e:
@@ -551,6 +738,8 @@ class DataInsightFramework:
     def analyze_bayesian_changepoint(self, data: np.ndarray) -> InsightResult:
         """贝叶斯转折点检测"""
         try:
+            import ruptures as rpt
+            
             algo = rpt.Dynp(model="normal", min_size=3, jump=5).fit(data)
             change_points = algo.predict(n_bkps=5)
             
@@ -586,7 +775,7 @@ class DataInsightFramework:
                 confidence=confidence,
                 description=description,
                 details=details,
-                affected_data=change_points,
+                affected_data=np.asarray(change_points, dtype=np.int32),
                 recommendations=recommendations
             )
         except Exception as e:
@@ -600,43 +789,21 @@ class DataInsightFramework:
                 recommendations=["数据可能不适合转折点检测"]
             )
 
-    def analyze_correlation(self, data1: np.ndarray, data2: np.ndarray, method: str = 'pearson') -> InsightResult:
-        """相关性分析"""
+    def analyze_correlation(self, data1: np.ndarray, data2: np.ndarray, method: str = 'pearson',
+                            ranks: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> InsightResult:
+        """相关性分析
+
+        ranks 为预先计算好的 (rankdata(data1), rankdata(data2))，传入时 spearman 直接在秩上计算
+        """
         try:
             if method == 'pearson':
                 corr, p_value = pearsonr(data1, data2)
+            elif ranks is not None:  # spearman，秩已预先计算
+                corr, p_value = pearsonr(*ranks)
             else:  # spearman
                 corr, p_value = spearmanr(data1, data2)
             
-            details = {
-                'correlation': float(corr),
-                'p_value': float(p_value),
-                'method': method,
-                'significant': p_value < 0.05
-            }
-            
-            abs_corr = abs(corr)
-            if abs_corr > 0.7:
-                severity = 'high'
-            elif abs_corr > 0.3:
-                severity = 'medium'
-            else:
-                severity = 'low'
-            
-            confidence = 1 - p_value if p_value < 0.05 else 0.5
-            
-            description = self._create_friendly_description(method, details, severity)
-            recommendations = self._get_friendly_recommendations(method, details)
-            
-            return InsightResult(
-                algorithm=method,
-                insight_type='correlation',
-                severity=severity,
-                confidence=confidence,
-                description=description,
-                details=details,
-                recommendations=recommendations
-            )
+            return self._build_correlation_result(method, float(corr), float(p_value))
         except Exception as e:
             return InsightResult(
                 algorithm=method,
@@ -648,6 +815,41 @@ class DataInsightFramework:
                 recommendations=["检查数据质量和格式"]
             )
 
+    def _build_correlation_result(self, method: str, corr: float, p_value: float, 
+                                  columns: Optional[List[str]] = None) -> InsightResult:
+        """根据相关系数和p值构建相关性洞察结果"""
+        details = {
+            'correlation': corr,
+            'p_value': p_value,
+            'method': method,
+            'significant': p_value < 0.05
+        }
+        if columns is not None:
+            details = {'columns': columns, **details}
+        
+        abs_corr = abs(corr)
+        if abs_corr > 0.7:
+            severity = 'high'
+        elif abs_corr > 0.3:
+            severity = 'medium'
+        else:
+            severity = 'low'
+        
+        confidence = 1 - p_value if p_value < 0.05 else 0.5
+        
+        description = self._create_friendly_description(method, details, severity)
+        recommendations = self._get_friendly_recommendations(method, details)
+        
+        return InsightResult(
+            algorithm=method,
+            insight_type='correlation',
+            severity=severity,
+            confidence=confidence,
+            description=description,
+            details=details,
+            recommendations=recommendations
+        )
+
     def analyze_dbscan(self, data: np.ndarray, eps: float = None, min_samples: int = None) -> InsightResult:
         """DBSCAN聚类分析"""
         if eps is None:
@@ -655,6 +857,8 @@ class DataInsightFramework:
         if min_samples is None:
             min_samples = self.config['dbscan_min_samples']
         
+        from sklearn.cluster import DBSCAN
+        
         if len(data.shape) == 1:
             data = data.reshape(-1, 1)
         
@@ -684,7 +888,7 @@ class DataInsightFramework:
                 "考虑调整聚类参数"
             ])
         
-        noise_indices = [i for i, label in enumerate(labels) if label == -1]
+        noise_indices = np.flatnonzero(labels == -1).astype(np.int32, copy=False)
         
         return InsightResult(
             algorithm='dbscan',
@@ -781,7 +985,27 @@ class DataInsightFramework:
                 **kwargs) -> List[InsightResult]:
         """统一分析接口"""
         self.clear_results()
-        
+        self.results = self._analyze(data, column, algorithms, **kwargs)
+        return self.results
+
+    async def aanalyze(self, data: Union[pd.DataFrame, pd.Series, np.ndarray], 
+                       column: str = None, 
+                       algorithms: List[str] = None,
+                       **kwargs) -> List[InsightResult]:
+        """异步分析接口
+
+        计算在线程池中执行，可与其他分析或大模型请求一起并发等待。
+        并发调用时每次返回各自的结果，self.results 保存最后完成的一次。
+        """
+        results = await asyncio.to_thread(self._analyze, data, column, algorithms, **kwargs)
+        self.results = results
+        return results
+
+    def _analyze(self, data: Union[pd.DataFrame, pd.Series, np.ndarray], 
+                 column: str = None, 
+                 algorithms: List[str] = None,
+                 **kwargs) -> List[InsightResult]:
+        """执行分析并返回结果列表，不修改 self.results"""
         # 数据预处理
         if isinstance(data, pd.DataFrame):
             if column is None:
@@ -792,6 +1016,7 @@ class DataInsightFramework:
                 column = numeric_cols[0]
             analysis_data = data[column].dropna().values
         elif isinstance(data, pd.Series):
+            column = column if column is not None else data.name
             analysis_data = data.dropna().values
         else:
             analysis_data = np.array(data)
@@ -800,15 +1025,53 @@ class DataInsightFramework:
         if len(analysis_data) == 0:
             raise ValueError("没有有效的数据进行分析")
         
+        # 相同数据与参数直接复用缓存结果；缓存保存独立副本，每次命中返回新的深拷贝，
+        # 调用方修改返回结果（如 recommendations、details、affected_data）不会影响缓存
+        cache_key = None
+        if analysis_data.dtype.kind in 'biuf' and analysis_data.nbytes <= self._ANALYZE_CACHE_MAX_BYTES:
+            cache_key = (
+                hashlib.blake2b(np.ascontiguousarray(analysis_data).tobytes(), digest_size=16).digest(),
+                analysis_data.dtype.str,
+                column,
+                tuple(algorithms) if algorithms is not None else None,
+                repr(sorted(kwargs.items())),
+                repr(sorted(self.config.items()))
+            )
+            with self._analyze_cache_lock:
+                cached = self._analyze_cache.get(cache_key)
+                if cached is not None:
+                    self._analyze_cache.move_to_end(cache_key)
+                    return copy.deepcopy(list(cached))
+        
+        results = self._run_algorithms(analysis_data, algorithms, column=column, **kwargs)
+        
+        if cache_key is not None:
+            with self._analyze_cache_lock:
+                self._analyze_cache[cache_key] = tuple(copy.deepcopy(results))
+                if len(self._analyze_cache) > self._ANALYZE_CACHE_SIZE:
+                    self._analyze_cache.popitem(last=False)
+        
+        return results
+
+    def _run_algorithms(self, analysis_data: np.ndarray, 
+                        algorithms: List[str] = None, 
+                        column: Optional[str] = None,
+                        **kwargs) -> List[InsightResult]:
+        """在已清洗的一维数据上运行算法列表，column 会记录到每个结果上"""
         # 默认算法列表
         if algorithms is None:
             algorithms = ['basic_stats', 'zscore', 'iqr', 'mann_kendall']
-            if len(analysis_data) > 10:
-                algorithms.extend(['lof', 'cv_periodicity'])
-            if len(analysis_data) > 20:
-                algorithms.extend(['page_hinkley', 'bayesian', 'dbscan'])
+            if len(analysis_data) > self.config['large_data_threshold']:
+                # 大数据量下LOF/DBSCAN开销过高，改用孤立森林批量打分
+                algorithms.extend(['iforest', 'cv_periodicity', 'page_hinkley', 'bayesian'])
+            else:
+                if len(analysis_data) > 10:
+                    algorithms.extend(['lof', 'cv_periodicity'])
+                if len(analysis_data) > 20:
+                    algorithms.extend(['page_hinkley', 'bayesian', 'dbscan'])
         
         # 运行分析算法
+        results = []
         for algorithm in algorithms:
             try:
                 if algorithm == 'zscore':
@@ -817,6 +1080,8 @@ class DataInsightFramework:
                     result = self.analyze_iqr(analysis_data, **kwargs)
                 elif algorithm == 'lof':
                     result = self.analyze_lof(analysis_data, **kwargs)
+                elif algorithm == 'iforest':
+                    result = self.analyze_isolation_forest(analysis_data)
                 elif algorithm == 'mann_kendall':
                     result = self.analyze_mann_kendall(analysis_data, **kwargs)
                 elif algorithm == 'page_hinkley':
@@ -832,124 +1097,350 @@ class DataInsightFramework:
                 else:
                     continue
                 
-                self.results.append(result)
+                result.column = column
+                results.append(result)
             except Exception as e:
                 print(f"算法 {algorithm} 执行失败: {str(e)}")
         
-        return self.results
+        return results
+
+    def analyze_many(self, data: pd.DataFrame, 
+                     columns: List[str] = None, 
+                     pairs: List[Tuple[str, str]] = None, 
+                     algorithms: List[str] = None, 
+                     n_jobs: int = -1,
+                     **kwargs) -> Dict[Any, List[InsightResult]]:
+        """多列批量分析
+
+        对整个DataFrame只做一次类型转换和缺失值掩码，再分发到各列及列对。
+        各列分析通过线程池并行执行（NumPy/SciPy计算会释放GIL），n_jobs 控制并行度。
+        返回以列名（列对为元组）为键的结果字典，所有结果同时追加到 self.results
+        """
+        self.clear_results()
+        
+        if columns is None:
+            columns = list(data.select_dtypes(include=[np.number]).columns)
+        pairs = pairs or []
+        
+        # 一次性转换为float64矩阵并计算缺失值掩码
+        needed = list(dict.fromkeys(list(columns) + [col for pair in pairs for col in pair]))
+        matrix = data[needed].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(matrix)
+        column_data = {col: matrix[valid[:, i], i] for i, col in enumerate(needed)}
+        
+        active_columns = [col for col in columns if len(column_data[col])]
+        column_results = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(self._run_algorithms)(column_data[col], algorithms, column=col, **kwargs)
+            for col in active_columns
+        )
+        by_column = dict(zip(active_columns, column_results))
+        
+        grouped = {}
+        for col in columns:
+            grouped[col] = by_column.get(col, [])
+            self.results.extend(grouped[col])
+        
+        for col1, col2 in pairs:
+            grouped[(col1, col2)] = self._correlate(column_data[col1], column_data[col2])
+            self.results.extend(grouped[(col1, col2)])
+        
+        return grouped
+
+    def _correlate(self, data1: np.ndarray, data2: np.ndarray, 
+                   methods: List[str] = None) -> List[InsightResult]:
+        """对两组已去除缺失值的数据计算相关性"""
+        if methods is None:
+            methods = ['pearson', 'spearman']
+        
+        # 确保数据长度一致（切片为视图，不复制数据）
+        min_len = min(len(data1), len(data2))
+        data1 = np.ascontiguousarray(data1[:min_len])
+        data2 = np.ascontiguousarray(data2[:min_len])
+        
+        # 多种方法共享同一份秩
+        ranks = None
+        if 'spearman' in methods and min_len > 0:
+            ranks = (rankdata(data1), rankdata(data2))
+        
+        return [self.analyze_correlation(data1, data2, method, ranks=ranks) for method in methods]
 
     def analyze_correlation_pair(self, data: pd.DataFrame, col1: str, col2: str, 
                                 methods: List[str] = None) -> List[InsightResult]:
         """分析两个变量的相关性"""
-        if methods is None:
-            methods = ['pearson', 'spearman']
+        data1 = data[col1].dropna().to_numpy(dtype=np.float64)
+        data2 = data[col2].dropna().to_numpy(dtype=np.float64)
         
-        data1 = data[col1].dropna().values
-        data2 = data[col2].dropna().values
+        results = self._correlate(data1, data2, methods)
+        self.results.extend(results)
         
-        # 确保数据长度一致
-        min_len = min(len(data1), len(data2))
-        data1 = data1[:min_len]
-        data2 = data2[:min_len]
+        return results
+
+    @staticmethod
+    def _correlation_matrix(X: np.ndarray, method: str = 'pearson') -> Tuple[np.ndarray, np.ndarray]:
+        """一次矩阵运算求出所有列两两之间的相关系数及p值"""
+        n = X.shape[0]
+        # 先整体求秩再做一次矩阵相关计算，避免逐对调用spearmanr
+        if method == 'spearman':
+            X = rankdata(X, method='average', axis=0)
+        corr_matrix = np.corrcoef(X, rowvar=False)
+        
+        # 向量化计算t检验p值
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.clip(corr_matrix, -1.0, 1.0)
+            t_stat = np.abs(r) * np.sqrt((n - 2) / (1 - r ** 2))
+        p_matrix = 2 * stats.t.sf(t_stat, n - 2)
+        p_matrix = np.nan_to_num(p_matrix, nan=1.0)
+        return corr_matrix, p_matrix
+
+    def analyze_correlation_matrix(self, data: pd.DataFrame, method: str = 'spearman') -> List[InsightResult]:
+        """一次性计算所有数值列之间的相关性矩阵，只输出显著的列对"""
+        numeric_data = data.select_dtypes(include=[np.number]).dropna()
+        columns = list(numeric_data.columns)
+        if len(columns) < 2 or len(numeric_data) < 3:
+            return []
+        
+        X = numeric_data.to_numpy(dtype=np.float64, copy=False)
+        corr_matrix, p_matrix = self._correlation_matrix(X, method)
         
         results = []
-        for method in methods:
-            result = self.analyze_correlation(data1, data2, method)
+        rows, cols = np.triu_indices(len(columns), k=1)
+        for i, j in zip(rows, cols):
+            corr = float(corr_matrix[i, j])
+            p_value = float(p_matrix[i, j])
+            if np.isnan(corr) or p_value >= 0.05:
+                continue
+            
+            result = self._build_correlation_result(method, corr, p_value, columns=[columns[i], columns[j]])
+            result.description = f"{columns[i]} 与 {columns[j]}: {result.description}"
             results.append(result)
             self.results.append(result)
         
         return results
 
+    def analyze_correlations(self, data: pd.DataFrame, columns: List[str] = None, 
+                             methods: List[str] = None) -> Dict[Tuple[str, str], List[InsightResult]]:
+        """批量分析多列两两之间的相关性
+
+        每种方法只做一次矩阵计算，再按列对切片，结果与逐对调用 analyze_correlation_pair 相同
+        （以所有选中列都非空的行为样本）。返回以 (col1, col2) 为键的结果字典
+        """
+        if methods is None:
+            methods = ['pearson', 'spearman']
+        if columns is None:
+            columns = list(data.select_dtypes(include=[np.number]).columns)
+        
+        X = data[columns].dropna().to_numpy(dtype=np.float64)
+        matrices = {method: self._correlation_matrix(X, method) for method in methods}
+        
+        grouped = {}
+        for i, j in zip(*np.triu_indices(len(columns), k=1)):
+            pair = (columns[i], columns[j])
+            grouped[pair] = []
+            for method in methods:
+                corr_matrix, p_matrix = matrices[method]
+                result = self._build_correlation_result(
+                    method, float(corr_matrix[i, j]), float(p_matrix[i, j]), columns=list(pair)
+                )
+                grouped[pair].append(result)
+                self.results.append(result)
+        
+        return grouped
+
+    @staticmethod
+    def _results_digest(results: List[InsightResult], context: str = "") -> str:
+        """计算结果列表与背景信息的摘要，用作报告缓存键"""
+        dicts = [result._cached_dict for result in results]
+        if HAS_ORJSON:
+            payload = orjson.dumps(dicts, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(dicts, ensure_ascii=False, default=str).encode()
+        return hashlib.blake2b(payload + context.encode(), digest_size=16).hexdigest()
+
+    def _sorted_results(self) -> List[InsightResult]:
+        """按严重程度和置信度排序结果"""
+        return sorted(self.results, 
+                      key=operator.attrgetter('severity_rank', 'confidence'), 
+                      reverse=True)
+
+    def _get_cached_report(self, cache_key: str) -> Optional[str]:
+        """读取大模型优化报告缓存"""
+        report = self._llm_report_cache.get(cache_key)
+        if report is not None:
+            self._llm_report_cache.move_to_end(cache_key)
+        return report
+
+    def _set_cached_report(self, cache_key: str, report: str):
+        """写入大模型优化报告缓存"""
+        self._llm_report_cache[cache_key] = report
+        if len(self._llm_report_cache) > self._LLM_REPORT_CACHE_SIZE:
+            self._llm_report_cache.popitem(last=False)
+
     def get_summary_report(self, context: str = "") -> str:
         """生成通俗易懂的摘要报告"""
         if not self.results:
             return "暂无分析结果"
         
         # 按严重程度排序
-        severity_order = {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}
-        sorted_results = sorted(self.results, 
-                              key=lambda x: (severity_order.get(x.severity, 0), x.confidence), 
-                              reverse=True)
+        sorted_results = self._sorted_results()
         
-        # 如果配置了大模型优化器，使用它来优化报告
+        # 如果配置了大模型优化器，使用它来优化报告（相同结果与背景复用缓存）
         if self.llm_optimizer:
             try:
-                return self.llm_optimizer.optimize_report(sorted_results, context)
+                cache_key = self._results_digest(sorted_results, context)
+                report = self._get_cached_report(cache_key)
+                if report is None:
+                    report, from_llm = self.llm_optimizer.optimize_report_with_status(sorted_results, context)
+                    # 只缓存大模型的真实输出，备用报告下次仍重新请求
+                    if from_llm:
+                        self._set_cached_report(cache_key, report)
+                return report
             except Exception as e:
                 print(f"大模型优化失败: {e}")
                 # 继续使用默认报告
         
-        # 默认报告格式
-        report = ["📊 数据洞察报告", "=" * 50, ""]
+        return self._build_default_report(sorted_results, context)
+
+    async def aget_summary_report(self, context: str = "") -> str:
+        """异步生成摘要报告，便于并发等待多个大模型请求"""
+        if not self.results:
+            return "暂无分析结果"
+        
+        sorted_results = self._sorted_results()
+        
+        if self.llm_optimizer:
+            try:
+                cache_key = self._results_digest(sorted_results, context)
+                report = self._get_cached_report(cache_key)
+                if report is None:
+                    report, from_llm = await self.llm_optimizer.aoptimize_report_with_status(sorted_results, context)
+                    # 只缓存大模型的真实输出，备用报告下次仍重新请求
+                    if from_llm:
+                        self._set_cached_report(cache_key, report)
+                return report
+            except Exception as e:
+                print(f"大模型优化失败: {e}")
+        
+        return self._build_default_report(sorted_results, context)
+
+    def _build_default_report(self, sorted_results: List[InsightResult], context: str = "") -> str:
+        """生成默认格式的报告（不使用大模型）"""
+        buf = io.StringIO()
+        w = buf.write
+        w("📊 数据洞察报告\n" + "=" * 50 + "\n\n")
         
         if context:
-            report.extend([f"📋 分析背景: {context}", ""])
+            w(f"📋 分析背景: {context}\n\n")
+        
+        # 单次遍历按严重程度分桶（保持排序后的顺序）
+        buckets = {'critical': [], 'high': [], 'medium': [], 'low': []}
+        for result in sorted_results:
+            bucket = buckets.get(result.severity)
+            if bucket is not None:
+                bucket.append(result)
         
         # 重要发现
-        high_severity = [r for r in sorted_results if r.severity in ['critical', 'high']]
+        high_severity = buckets['critical'] + buckets['high']
         if high_severity:
-            report.extend(["🚨 重要发现:", ""])
+            w("🚨 重要发现:\n\n")
             for i, result in enumerate(high_severity, 1):
-                report.append(f"{i}. {result.to_friendly_description()}")
+                w(f"{i}. {result.friendly}\n")
                 if result.recommendations:
-                    report.append(f"   💡 建议: {'; '.join(result.recommendations[:2])}")
-                report.append("")
+                    w(f"   💡 建议: {'; '.join(result.recommendations[:2])}\n")
+                w("\n")
         
         # 一般发现
-        medium_severity = [r for r in sorted_results if r.severity == 'medium']
+        medium_severity = buckets['medium']
         if medium_severity:
-            report.extend(["📈 一般发现:", ""])
+            w("📈 一般发现:\n\n")
             for i, result in enumerate(medium_severity, 1):
-                report.append(f"{i}. {result.to_friendly_description()}")
-                report.append("")
+                w(f"{i}. {result.friendly}\n\n")
         
         # 基础信息
-        low_severity = [r for r in sorted_results if r.severity == 'low']
+        low_severity = buckets['low']
         if low_severity:
-            report.extend(["📋 基础信息:", ""])
+            w("📋 基础信息:\n\n")
             for i, result in enumerate(low_severity, 1):
-                report.append(f"{i}. {result.to_friendly_description()}")
-                report.append("")
+                w(f"{i}. {result.friendly}\n\n")
         
-        # 总结建议
-        all_recommendations = []
+        # 总结建议（增量去重，取满5条即停止）
+        unique_recommendations = {}
         for result in high_severity + medium_severity:
-            all_recommendations.extend(result.recommendations)
+            for rec in result.recommendations:
+                if rec not in unique_recommendations:
+                    unique_recommendations[rec] = None
+                    if len(unique_recommendations) == 5:
+                        break
+            if len(unique_recommendations) == 5:
+                break
         
-        if all_recommendations:
-            unique_recommendations = list(dict.fromkeys(all_recommendations))[:5]  # 去重并限制数量
-            report.extend(["💡 总体建议:", ""])
+        if unique_recommendations:
+            w("💡 总体建议:\n\n")
             for i, rec in enumerate(unique_recommendations, 1):
-                report.append(f"{i}. {rec}")
-            report.append("")
+                w(f"{i}. {rec}\n")
+            w("\n")
         
-        report.extend(["", f"📅 分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"])
+        w(f"\n📅 分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        return "\n".join(report)
+        return buf.getvalue()
+
+    def dump_results(self, fp, format: str = 'json'):
+        """将结果逐条写入文本文件对象，避免先在内存中构建完整的JSON字符串"""
+        if format != 'json':
+            raise ValueError("支持的格式: 'json'")
+        
+        if HAS_ORJSON:
+            option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            fp.write('[')
+            for i, result in enumerate(self.results):
+                fp.write(',\n' if i else '\n')
+                fp.write(orjson.dumps(result._cached_dict, default=str, option=option).decode())
+            fp.write('\n]' if self.results else ']')
+        else:
+            json.dump([result._cached_dict for result in self.results], fp,
+                      indent=2, ensure_ascii=False, default=str)
 
     def export_results(self, format: str = 'json') -> Union[str, Dict]:
         """导出结果"""
         if format == 'json':
-            return json.dumps([result.to_dict() for result in self.results], 
+            if HAS_ORJSON:
+                return orjson.dumps(
+                    [result._cached_dict for result in self.results],
+                    default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                ).decode()
+            return json.dumps([result._cached_dict for result in self.results], 
                             indent=2, ensure_ascii=False, default=str)
         elif format == 'dict':
-            return [result.to_dict() for result in self.results]
+            # 返回缓存字典的副本，调用方增删键或修改 affected_data 不会影响之后的导出和报告；
+            # details、recommendations 与 to_dict() 一样直接引用结果对象上的值
+            return [
+                dict(cached, affected_data=list(cached['affected_data']))
+                for cached in (result._cached_dict for result in self.results)
+            ]
         else:
             raise ValueError("支持的格式: 'json', 'dict'")
 
 # 测试代码
 if __name__ == "__main__":
     # 创建测试数据
-    np.random.seed(42)
-    dates = pd.date_range('2023-01-01', periods=100, freq='D')
-    sales = 1000 + np.linspace(0, 200, 100) + np.random.normal(0, 30, 100)
+    rng = np.random.default_rng(42)
+    n = 100
+    dates = pd.date_range('2023-01-01', periods=n, freq='D')
+    # 原地运算，每个序列只分配一次
+    sales = rng.standard_normal(n)
+    sales *= 30
+    sales += np.linspace(1000, 1200, n)
     sales[20] = 2000  # 异常高值
     sales[50] = 200   # 异常低值
     
+    advertising = rng.standard_normal(n)
+    advertising *= 10
+    advertising += 0.1 * sales
+    
     data = pd.DataFrame({
         'date': dates,
         'sales': sales,
-        'advertising': sales * 0.1 + np.random.normal(0, 10, 100)
+        'advertising': advertising
     })
     
     # 测试基础框架
@@ -964,4 +1455,4 @@ if __name__ == "__main__":
     corr_insights = framework.analyze_correlation_pair(data, 'sales', 'advertising')
     
     for insight in corr_insights:
-        print(insight.to_friendly_description()) 
\ No newline at end of file
+        print(insight.friendly) 
\ No newline at end of file
@@ -0,0 +1,171 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+大模型响应缓存
+对确定性（temperature=0）的大模型调用按 (model, prompt, temperature) 缓存结果
+"""
+
+import os
+import json
+import stat
+import time
+import hashlib
+import logging
+import tempfile
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _default_cache_dir() -> str:
+    """应用专属的缓存目录，默认位于当前用户的缓存目录下，而不是共享的系统临时目录"""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "iasmind", "llm_cache")
+
+
+class DiskCacheBackend:
+    """以JSON文件形式存储在本地磁盘的缓存后端
+    
+    缓存目录仅允许当前用户访问（0700），目录归属或权限不符时不使用缓存，
+    防止其他用户预先写入缓存内容。条目超过 ttl 秒后失效，条目数超过 max_entries 时淘汰最旧的条目。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.cache_dir = cache_dir or os.getenv("LLM_CACHE_DIR") or _default_cache_dir()
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_SIZE", "100"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", "86400"))
+        self.enabled = self.max_entries > 0 and self._prepare_dir(self.cache_dir)
+        # 当前条目数，首次写入时统计一次
+        self._entries = None
+
+    @staticmethod
+    def _prepare_dir(path: str) -> bool:
+        """创建仅当前用户可访问的目录，已存在的目录须归当前用户所有且不允许其他用户访问"""
+        try:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            info = os.lstat(path)
+            # Windows 上没有 getuid，只检查是否为目录
+            if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+                logger.warning(f"LLM缓存目录不属于当前用户，已禁用缓存: {path}")
+                return False
+            if info.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                os.chmod(path, 0o700)
+            return True
+        except Exception as e:
+            logger.warning(f"LLM缓存目录不可用，已禁用缓存: {path}, 错误={e}")
+            return False
+
+    def _path(self, key: str) -> str:
+        # 按键前两位分目录，避免单目录文件过多
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中、已过期或读取失败时返回None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取LLM缓存失败: key={key}, 错误={e}")
+            return None
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            self._remove(path)
+            return None
+        return entry.get("response")
+
+    def set(self, key: str, value: str):
+        """写入缓存，先写临时文件再原子替换"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        try:
+            directory = os.path.dirname(path)
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            existed = os.path.exists(path)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"response": value, "created_at": time.time()}, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+            if not existed:
+                self._count_added()
+        except Exception as e:
+            logger.warning(f"写入LLM缓存失败: key={key}, 错误={e}")
+
+    def _count_added(self):
+        """记录新增的条目，超出上限时清理"""
+        if self._entries is None:
+            self._entries = sum(1 for _ in self._entry_paths())
+        else:
+            self._entries += 1
+        if self._entries > self.max_entries:
+            self._prune()
+
+    def _prune(self):
+        """删除已过期的条目，仍超出上限时按写入时间淘汰最旧的条目"""
+        now = time.time()
+        entries = []
+        for path in self._entry_paths():
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.ttl:
+                self._remove(path)
+            else:
+                entries.append((mtime, path))
+        entries.sort()
+        excess = len(entries) - self.max_entries
+        for _, path in entries[:max(excess, 0)]:
+            self._remove(path)
+        self._entries = min(len(entries), self.max_entries)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class LLMCache:
+    """大模型响应缓存，只缓存 temperature=0 的确定性调用"""
+
+    def __init__(self, backend: Optional[DiskCacheBackend] = None):
+        self.backend = backend or DiskCacheBackend()
+
+    @staticmethod
+    def cache_key(model: Optional[str], prompt: Any, temperature: Optional[float]) -> Optional[str]:
+        """计算缓存键，非确定性调用返回None表示不缓存"""
+        if temperature != 0:
+            return None
+        payload = json.dumps(
+            {"model": model, "messages": prompt, "temperature": 0},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        return self.backend.get(key)
+
+    def set(self, key: Optional[str], value: str):
+        if key is None:
+            return
+        self.backend.set(key, value)
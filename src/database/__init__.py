@@ -6,7 +6,15 @@
 提供MySQL数据库连接和模型定义
 """
 
-from .connection import DatabaseConnection
-from .models import KnowledgeBase, FileDocument
+__all__ = ["DatabaseConnection", "KnowledgeBase", "FileDocument"]
 
-__all__ = ["DatabaseConnection", "KnowledgeBase", "FileDocument"] 
\ No newline at end of file
+
+def __getattr__(name):
+    """按需导入，避免仅引用子模块时加载pymysql等依赖"""
+    if name == "DatabaseConnection":
+        from .connection import DatabaseConnection
+        return DatabaseConnection
+    if name in ("KnowledgeBase", "FileDocument"):
+        from . import models
+        return getattr(models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
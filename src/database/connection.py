@@ -6,18 +6,123 @@ MySQL数据库连接管理
 """
 
 import os
+import re
+import time
+import hashlib
+import queue
+import asyncio
 import logging
+import threading
 from typing import Optional
-import pymysql
-from pymysql.cursors import DictCursor
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
+# 优先使用C扩展实现的mysqlclient驱动，未安装时回退到纯Python的pymysql
+try:
+    import MySQLdb as mysql_driver
+    from MySQLdb.constants import CLIENT
+    from MySQLdb.cursors import Cursor, DictCursor, SSDictCursor
+    HAS_MYSQLCLIENT = True
+except ImportError:
+    import pymysql as mysql_driver
+    from pymysql.constants import CLIENT
+    from pymysql.cursors import Cursor, DictCursor, SSDictCursor
+    HAS_MYSQLCLIENT = False
+
 logger = logging.getLogger(__name__)
 
 
+# 建表脚本，导入时读取一次
+_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+with open(_SCHEMA_PATH, encoding="utf-8") as _schema_file:
+    _SCHEMA_SCRIPT = _schema_file.read()
+_CREATE_TABLE_RE = re.compile(r"^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?", re.IGNORECASE)
+_REFERENCES_RE = re.compile(r"\bREFERENCES\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def _GroupSchemaStatements(script: str):
+    """按外键依赖将建表语句分组，组内保持原有顺序，不同组之间互不依赖
+    
+    脚本中含有建表以外的语句（如 CREATE INDEX、ALTER、SET）时无法判断依赖，
+    整个脚本作为一组按原有顺序执行
+    """
+    table_groups = {}
+    groups = []
+    for stmt in script.split(";"):
+        body = "\n".join(
+            line for line in stmt.splitlines() if not line.lstrip().startswith("--")
+        ).strip()
+        if not body:
+            continue
+        created = _CREATE_TABLE_RE.match(body)
+        if created is None:
+            return (script,)
+        group = None
+        for parent in _REFERENCES_RE.findall(body):
+            parent_group = table_groups.get(parent)
+            if parent_group is None or parent_group is group:
+                continue
+            if group is None:
+                group = parent_group
+            else:
+                # 同时依赖多个组时合并，两组都在当前语句之前，顺序仍满足依赖
+                group.extend(parent_group)
+                groups.remove(parent_group)
+                for table, g in table_groups.items():
+                    if g is parent_group:
+                        table_groups[table] = group
+        if group is None:
+            group = []
+            groups.append(group)
+        group.append(body + ";")
+        table_groups[created.group(1)] = group
+    return tuple("\n\n".join(group) for group in groups)
+
+
+_SCHEMA_GROUPS = _GroupSchemaStatements(_SCHEMA_SCRIPT)
+# 建表脚本指纹，与 _schema_meta 中记录的一致时跳过建表
+_SCHEMA_DIGEST = hashlib.sha256(_SCHEMA_SCRIPT.encode("utf-8")).hexdigest()
+_SCHEMA_DIGEST_QUERY = "SELECT meta_value FROM _schema_meta WHERE meta_key = 'schema_digest'"
+_SCHEMA_DIGEST_SAVE = "REPLACE INTO _schema_meta (meta_key, meta_value) VALUES ('schema_digest', %s)"
+# 旧版建表脚本中允许为NULL的计数列，现已改为 NOT NULL DEFAULT 0，需迁移已存在的表
+_NULLABLE_COUNT_COLUMNS_QUERY = """
+    SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND IS_NULLABLE = 'YES'
+      AND TABLE_NAME IN ('knowledge_bases', 'file_documents')
+      AND COLUMN_NAME IN ('file_count', 'vector_count')
+    """
+# 建表脚本中新增的索引，已存在的表需补建: (表名, 索引名, 列)
+_ADDED_INDEXES = (
+    ("file_documents", "idx_kb_uploaded", "knowledge_base_id, uploaded_at"),
+    ("file_documents", "idx_kb_status_uploaded", "knowledge_base_id, status, uploaded_at"),
+    ("file_exploration", "idx_user_status_updated", "user_id, status, updated_at"),
+    ("knowledge_bases", "idx_status_created", "status, created_at"),
+)
+_EXISTING_INDEXES_QUERY = """
+    SELECT DISTINCT TABLE_NAME AS table_name, INDEX_NAME AS index_name FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('file_documents', 'file_exploration', 'knowledge_bases')
+    """
+
+# 查询语句引用的表名，以及写语句修改的表名，用于查询缓存失效
+_READ_TABLES_RE = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+_WRITE_TABLE_RE = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?",
+    re.IGNORECASE
+)
+
+
 class DatabaseConnection:
     """MySQL数据库连接管理类"""
     
+    __slots__ = (
+        "host", "port", "user", "password", "database", "charset", "unix_socket", "schema_workers",
+        "pool_max_idle", "pool_max_connections", "pool_ping_interval", "_pool", "_pool_lock", "_pool_slots",
+        "lazy_init_tables", "_tables_initialized", "_init_lock",
+        "query_cache_ttl", "query_cache_size", "_query_cache", "_query_cache_lock",
+        "_query_cache_generation",
+    )
+    
     def __init__(self):
         self.host = os.getenv("MYSQL_HOST", "localhost")
         self.port = int(os.getenv("MYSQL_PORT", "3306"))
@@ -25,48 +130,158 @@ class DatabaseConnection:
         self.password = os.getenv("MYSQL_PASSWORD", "")
         self.database = os.getenv("MYSQL_DATABASE", "iasmind")
         self.charset = os.getenv("MYSQL_CHARSET", "utf8mb4")
-        self._connection = None
+        # MySQL与应用部署在同一主机时可通过Unix套接字连接，省去TCP回环开销
+        self.unix_socket = os.getenv("MYSQL_UNIX_SOCKET") or None
+        # 并行建表的最大线程数，各组分别使用独立连接
+        self.schema_workers = int(os.getenv("MYSQL_SCHEMA_WORKERS", "4"))
+        # 连接池配置：空闲连接上限与总连接数上限
+        self.pool_max_idle = int(os.getenv("MYSQL_POOL_MAX_IDLE", "10"))
+        self.pool_max_connections = int(os.getenv("MYSQL_POOL_MAX_CONNECTIONS", "32"))
+        # 空闲超过该秒数的连接在取出时先ping一次，避免使用已被服务端wait_timeout断开的连接
+        self.pool_ping_interval = float(os.getenv("MYSQL_POOL_PING_INTERVAL", "30"))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pool_slots = None
+        # 为true时启动阶段不建表，推迟到第一次获取游标时执行
+        self.lazy_init_tables = os.getenv("MYSQL_LAZY_INIT_TABLES", "false").lower() == "true"
+        self._tables_initialized = False
+        self._init_lock = threading.Lock()
+        # CachedQuery 的进程内结果缓存：{(sql, params): (过期时间, 引用的表, 结果)}
+        self.query_cache_ttl = float(os.getenv("MYSQL_QUERY_CACHE_TTL", "5"))
+        self.query_cache_size = int(os.getenv("MYSQL_QUERY_CACHE_SIZE", "1024"))
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self._query_cache_generation = 0
+    
+    def _GetPool(self):
+        """延迟初始化连接池"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool_slots = threading.BoundedSemaphore(self.pool_max_connections)
+                    self._pool = queue.LifoQueue(maxsize=self.pool_max_idle)
+        return self._pool
+    
+    def _CreateConnection(self, client_flag: int = 0):
+        """新建一个MySQL连接
+        
+        TCP连接由驱动自动开启 TCP_NODELAY；配置了 MYSQL_UNIX_SOCKET 时改用Unix套接字
+        """
+        kwargs = {"unix_socket": self.unix_socket} if self.unix_socket else {}
+        try:
+            connection = mysql_driver.connect(
+                host=self.host,
+                port=self.port,
+                user=self.user,
+                password=self.password,
+                database=self.database,
+                charset=self.charset,
+                cursorclass=DictCursor,
+                autocommit=True,
+                client_flag=client_flag,
+                **kwargs
+            )
+            logger.info("MySQL数据库连接成功")
+            return connection
+        except Exception as e:
+            logger.error(f"MySQL数据库连接失败: {e}")
+            raise
     
     def GetConnection(self):
-        """获取数据库连接"""
-        if self._connection is None or not self._connection.open:
+        """从连接池取出一个数据库连接，用完后需调用ReleaseConnection归还"""
+        pool = self._GetPool()
+        # 总连接数达到上限时阻塞等待其他调用方归还
+        self._pool_slots.acquire()
+        try:
+            while True:
+                try:
+                    connection, last_used = pool.get_nowait()
+                except queue.Empty:
+                    return self._CreateConnection()
+                if not connection.open:
+                    continue
+                if time.monotonic() - last_used <= self.pool_ping_interval:
+                    return connection
+                try:
+                    connection.ping()
+                    return connection
+                except Exception as e:
+                    logger.warning("丢弃失效的MySQL连接: %s", e)
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+        except Exception:
+            self._pool_slots.release()
+            raise
+    
+    def ReleaseConnection(self, connection):
+        """将连接归还连接池，空闲连接已满时直接关闭"""
+        try:
+            if connection.open:
+                try:
+                    self._GetPool().put_nowait((connection, time.monotonic()))
+                except queue.Full:
+                    connection.close()
+        finally:
+            self._pool_slots.release()
+    
+    def CloseConnection(self):
+        """关闭连接池中的所有空闲连接"""
+        if self._pool is None:
+            return
+        while True:
             try:
-                self._connection = pymysql.connect(
-                    host=self.host,
-                    port=self.port,
-                    user=self.user,
-                    password=self.password,
-                    database=self.database,
-                    charset=self.charset,
-                    cursorclass=DictCursor,
-                    autocommit=True
-                )
-                logger.info("MySQL数据库连接成功")
+                connection, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            if connection.open:
+                connection.close()
+        logger.info("MySQL数据库连接已关闭")
+    
+    @contextmanager
+    def GetCursor(self, cursor_class=None):
+        """获取数据库游标的上下文管理器，默认使用DictCursor"""
+        if self.lazy_init_tables and not self._tables_initialized:
+            self.EnsureTables()
+        connection = self.GetConnection()
+        try:
+            cursor = connection.cursor(cursor_class)
+            try:
+                yield cursor
             except Exception as e:
-                logger.error(f"MySQL数据库连接失败: {e}")
+                # 自动提交模式下没有未提交的事务，无需额外发送ROLLBACK
+                if not connection.get_autocommit():
+                    connection.rollback()
+                logger.error("数据库操作失败: %s", e)
                 raise
-        return self._connection
-    
-    def CloseConnection(self):
-        """关闭数据库连接"""
-        if self._connection and self._connection.open:
-            self._connection.close()
-            self._connection = None
-            logger.info("MySQL数据库连接已关闭")
+            finally:
+                cursor.close()
+        finally:
+            self.ReleaseConnection(connection)
     
     @contextmanager
-    def GetCursor(self):
-        """获取数据库游标的上下文管理器"""
+    def TransactionCursor(self, cursor_class=None):
+        """在显式事务中执行多条语句的游标上下文管理器，正常退出时提交，异常时回滚"""
+        if self.lazy_init_tables and not self._tables_initialized:
+            self.EnsureTables()
         connection = self.GetConnection()
-        cursor = connection.cursor()
         try:
-            yield cursor
-        except Exception as e:
-            connection.rollback()
-            logger.error(f"数据库操作失败: {e}")
-            raise
+            connection.begin()
+            cursor = connection.cursor(cursor_class)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                logger.error("数据库事务失败: %s", e)
+                raise
+            finally:
+                cursor.close()
         finally:
-            cursor.close()
+            self.ReleaseConnection(connection)
+            # 事务内修改的表无法逐条识别，清空全部查询缓存
+            self._InvalidateQueryCache("")
     
     def ExecuteQuery(self, sql: str, params: Optional[tuple] = None):
         """执行查询语句"""
@@ -75,8 +290,77 @@ class DatabaseConnection:
                 cursor.execute(sql, params)
                 return cursor.fetchall()
         except Exception as e:
-            logger.error(f"执行查询失败: SQL={sql}, 参数={params}, 错误={e}")
+            logger.error("执行查询失败: SQL=%s, 参数=%s, 错误=%s", sql, params, e)
+            return []
+    
+    def CachedQuery(self, sql: str, params: Optional[tuple] = None, ttl: Optional[float] = None):
+        """带短时TTL缓存的查询，适用于读多写少的表
+        
+        通过本实例执行的写语句会使引用同一张表的缓存失效；其他进程的写入只能等待TTL过期。
+        返回的行对象在多次调用间共享，调用方不应修改。
+        """
+        # 参数可能以列表传入，转换为元组后才能作为字典键
+        key = (sql, tuple(params) if params is not None else None)
+        with self._query_cache_lock:
+            entry = self._query_cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._query_cache.move_to_end(key)
+                return entry[2]
+            generation = self._query_cache_generation
+        
+        try:
+            with self.GetCursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error("执行查询失败: SQL=%s, 参数=%s, 错误=%s", sql, params, e)
             return []
+        
+        ttl = self.query_cache_ttl if ttl is None else ttl
+        tables = frozenset(t.lower() for t in _READ_TABLES_RE.findall(sql))
+        with self._query_cache_lock:
+            # 查询期间有写操作时结果可能已过时，不写入缓存
+            if generation == self._query_cache_generation:
+                self._query_cache[key] = (time.monotonic() + ttl, tables, rows)
+                self._query_cache.move_to_end(key)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return rows
+    
+    def _InvalidateQueryCache(self, sql: str):
+        """写语句执行后清除引用被修改表的缓存，无法识别表名时清空全部缓存"""
+        with self._query_cache_lock:
+            self._query_cache_generation += 1
+            if not self._query_cache:
+                return
+            match = _WRITE_TABLE_RE.match(sql)
+            if match is None:
+                self._query_cache.clear()
+                return
+            table = match.group(1).lower()
+            stale = [key for key, entry in self._query_cache.items() if table in entry[1]]
+            for key in stale:
+                del self._query_cache[key]
+    
+    def ExecuteQueryRows(self, sql: str, params: Optional[tuple] = None):
+        """执行查询语句，返回 (列名列表, 元组行列表)，避免逐行构造字典"""
+        try:
+            with self.GetCursor(Cursor) as cursor:
+                cursor.execute(sql, params)
+                columns = [d[0] for d in cursor.description or ()]
+                return columns, cursor.fetchall()
+        except Exception as e:
+            logger.error("执行查询失败: SQL=%s, 参数=%s, 错误=%s", sql, params, e)
+            return [], ()
+    
+    def StreamQuery(self, sql: str, params: Optional[tuple] = None, cursor_class=SSDictCursor):
+        """流式执行大结果集查询，逐行产出而不在客户端缓存全部结果
+        
+        迭代期间会占用一个连接，需完整迭代或显式关闭生成器以归还连接
+        """
+        with self.GetCursor(cursor_class) as cursor:
+            cursor.execute(sql, params)
+            yield from cursor
     
     def ExecuteUpdate(self, sql: str, params: Optional[tuple] = None):
         """执行更新语句"""
@@ -85,8 +369,10 @@ class DatabaseConnection:
                 result = cursor.execute(sql, params)
                 return result
         except Exception as e:
-            logger.error(f"执行更新失败: SQL={sql}, 参数={params}, 错误={e}")
+            logger.error("执行更新失败: SQL=%s, 参数=%s, 错误=%s", sql, params, e)
             return 0
+        finally:
+            self._InvalidateQueryCache(sql)
     
     def ExecuteInsert(self, sql: str, params: Optional[tuple] = None):
         """执行插入语句并返回插入的ID"""
@@ -95,121 +381,127 @@ class DatabaseConnection:
                 cursor.execute(sql, params)
                 return cursor.lastrowid
         except Exception as e:
-            logger.error(f"执行插入失败: SQL={sql}, 参数={params}, 错误={e}")
+            logger.error("执行插入失败: SQL=%s, 参数=%s, 错误=%s", sql, params, e)
             return None
+        finally:
+            self._InvalidateQueryCache(sql)
+    
+    def ExecuteMany(self, sql: str, seq_of_params):
+        """批量执行同一语句，INSERT ... VALUES 会被合并为一条多行插入"""
+        try:
+            with self.GetCursor() as cursor:
+                return cursor.executemany(sql, seq_of_params)
+        except Exception as e:
+            logger.error("批量执行失败: SQL=%s, 错误=%s", sql, e)
+            return 0
+        finally:
+            self._InvalidateQueryCache(sql)
+    
+    async def ExecuteQueryAsync(self, sql: str, params: Optional[tuple] = None):
+        """异步执行查询语句，在线程池中运行以免阻塞事件循环"""
+        return await asyncio.to_thread(self.ExecuteQuery, sql, params)
+    
+    async def ExecuteUpdateAsync(self, sql: str, params: Optional[tuple] = None):
+        """异步执行更新语句"""
+        return await asyncio.to_thread(self.ExecuteUpdate, sql, params)
+    
+    async def ExecuteInsertAsync(self, sql: str, params: Optional[tuple] = None):
+        """异步执行插入语句并返回插入的ID"""
+        return await asyncio.to_thread(self.ExecuteInsert, sql, params)
+    
+    def ExecuteScript(self, sql: str):
+        """一次往返执行多条以分号分隔的语句
+        
+        使用单独开启 MULTI_STATEMENTS 的连接，连接池中的连接仍只允许单条语句
+        """
+        connection = self._CreateConnection(client_flag=CLIENT.MULTI_STATEMENTS)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+                # 逐个消费结果集，确保后续语句的错误能被抛出
+                while cursor.nextset():
+                    pass
+        finally:
+            connection.close()
+    
+    def EnsureTables(self):
+        """确保数据库表已初始化，每个进程只执行一次"""
+        if self._tables_initialized:
+            return
+        with self._init_lock:
+            if not self._tables_initialized:
+                self.InitializeTables()
+    
+    def _ReadSchemaDigest(self) -> Optional[str]:
+        """读取已应用的建表脚本指纹，_schema_meta 表不存在时返回None"""
+        connection = self.GetConnection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_SCHEMA_DIGEST_QUERY)
+                row = cursor.fetchone()
+            return row["meta_value"] if row else None
+        except Exception:
+            return None
+        finally:
+            self.ReleaseConnection(connection)
+    
+    def _WriteSchemaDigest(self):
+        """记录已应用的建表脚本指纹
+        
+        直接使用连接而不经过 GetCursor，避免延迟建表时在持有 _init_lock 的情况下再次进入 EnsureTables
+        """
+        connection = self.GetConnection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_SCHEMA_DIGEST_SAVE, (_SCHEMA_DIGEST,))
+        finally:
+            self.ReleaseConnection(connection)
+    
+    def _ApplySchema(self):
+        """执行建表脚本，互不依赖的表分组并行创建"""
+        workers = min(self.schema_workers, len(_SCHEMA_GROUPS))
+        if workers <= 1:
+            self.ExecuteScript(_SCHEMA_SCRIPT)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.ExecuteScript, group) for group in _SCHEMA_GROUPS]
+            for future in futures:
+                future.result()
+    
+    def _MigrateSchema(self):
+        """迁移已存在的表，CREATE TABLE IF NOT EXISTS 不会修改已有表的列定义"""
+        connection = self.GetConnection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_NULLABLE_COUNT_COLUMNS_QUERY)
+                for row in cursor.fetchall():
+                    table, column = row["table_name"], row["column_name"]
+                    cursor.execute(f"UPDATE {table} SET {column} = 0 WHERE {column} IS NULL")
+                    cursor.execute(f"ALTER TABLE {table} MODIFY {column} INT NOT NULL DEFAULT 0")
+                    logger.info("已将 %s.%s 迁移为 NOT NULL DEFAULT 0", table, column)
+                
+                cursor.execute(_EXISTING_INDEXES_QUERY)
+                existing = {(row["table_name"], row["index_name"]) for row in cursor.fetchall()}
+                for table, index, columns in _ADDED_INDEXES:
+                    if (table, index) not in existing:
+                        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+                        logger.info("已为 %s 补建索引 %s", table, index)
+        finally:
+            self.ReleaseConnection(connection)
     
     def InitializeTables(self):
-        """初始化数据库表"""
-        try:
-            # 创建知识库表
-            knowledge_base_sql = """
-            CREATE TABLE IF NOT EXISTS knowledge_bases (
-                id VARCHAR(36) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                file_count INT DEFAULT 0,
-                vector_count INT DEFAULT 0,
-                status ENUM('active', 'inactive', 'processing') DEFAULT 'active',
-                embedding_model VARCHAR(100) DEFAULT 'text-embedding-3-small',
-                chunk_size INT DEFAULT 1000,
-                chunk_overlap INT DEFAULT 200,
-                INDEX idx_status (status),
-                INDEX idx_created_at (created_at)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-            """
-            
-            # 创建文件文档表
-            file_documents_sql = """
-            CREATE TABLE IF NOT EXISTS file_documents (
-                id VARCHAR(36) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                type VARCHAR(100) NOT NULL,
-                size BIGINT NOT NULL,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status ENUM('uploaded', 'processing', 'vectorized', 'failed') DEFAULT 'uploaded',
-                knowledge_base_id VARCHAR(36) NOT NULL,
-                vector_count INT DEFAULT 0,
-                last_vectorized_at TIMESTAMP NULL,
-                error_message TEXT,
-                file_path VARCHAR(500) NOT NULL,
-                suffix VARCHAR(20),
-                metadata JSON,
-                INDEX idx_knowledge_base_id (knowledge_base_id),
-                INDEX idx_status (status),
-                INDEX idx_uploaded_at (uploaded_at),
-                INDEX idx_type (type),
-                INDEX idx_suffix (suffix),
-                FOREIGN KEY (knowledge_base_id) REFERENCES knowledge_bases(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-            """
-            
-            # 创建数据探索文件表
-            file_exploration_sql = """
-            CREATE TABLE IF NOT EXISTS file_exploration (
-                id VARCHAR(36) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                type VARCHAR(100) NOT NULL,
-                size BIGINT NOT NULL,
-                user_id VARCHAR(36) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                file_path VARCHAR(500) NOT NULL,
-                status ENUM('active', 'deleted') DEFAULT 'active',
-                suffix VARCHAR(20),
-                metadata JSON,
-                preview_data JSON,
-                data_insights JSON,
-                last_accessed_at TIMESTAMP NULL,
-                INDEX idx_user_id (user_id),
-                INDEX idx_status (status),
-                INDEX idx_created_at (created_at),
-                INDEX idx_updated_at (updated_at),
-                INDEX idx_type (type),
-                INDEX idx_suffix (suffix),
-                INDEX idx_last_accessed_at (last_accessed_at)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-            """
-            
-            # 创建数据源表
-            data_sources_sql = """
-            CREATE TABLE IF NOT EXISTS data_sources (
-                id VARCHAR(36) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                type ENUM('mysql', 'oracle') NOT NULL DEFAULT 'mysql',
-                host VARCHAR(255) NOT NULL,
-                port INT NOT NULL,
-                username VARCHAR(255) NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                database_name VARCHAR(255) NOT NULL,
-                schema_name VARCHAR(255),
-                service_name VARCHAR(255),
-                `ssl` TINYINT(1) DEFAULT 0,
-                ssl_ca TEXT,
-                ssl_cert TEXT,
-                ssl_key TEXT,
-                status ENUM('inactive', 'active', 'error') DEFAULT 'inactive',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                last_connected_at TIMESTAMP NULL,
-                error_message TEXT,
-                INDEX idx_status (status),
-                INDEX idx_type (type),
-                INDEX idx_created_at (created_at)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-            """
-            
-
-            
-
+        """初始化数据库表，建表脚本未变化时跳过"""
+        try:
+            if self._ReadSchemaDigest() == _SCHEMA_DIGEST:
+                self._tables_initialized = True
+                logger.info("数据库表结构未变化，跳过初始化")
+                return
             
-            self.ExecuteUpdate(knowledge_base_sql)
-            self.ExecuteUpdate(file_documents_sql)
-            self.ExecuteUpdate(file_exploration_sql)
-            self.ExecuteUpdate(data_sources_sql)
+            self._ApplySchema()
+            self._MigrateSchema()
+            self._WriteSchemaDigest()
             
+            self._tables_initialized = True
             logger.info("数据库表初始化完成")
             
         except Exception as e:
@@ -217,5 +509,13 @@ class DatabaseConnection:
             raise
 
 
+def _CreateDatabaseConnection():
+    """根据 IASMIND_DB_BACKEND 创建连接，开发测试环境可使用sqlite"""
+    if os.getenv("IASMIND_DB_BACKEND", "mysql").lower() == "sqlite":
+        from .sqlite_connection import SqliteConnection
+        return SqliteConnection()
+    return DatabaseConnection()
+
+
 # 全局数据库连接实例
-db_connection = DatabaseConnection() 
\ No newline at end of file
+db_connection = _CreateDatabaseConnection() 
\ No newline at end of file
@@ -6,22 +6,125 @@
 定义知识库和文件文档的数据操作
 """
 
+import os
 import uuid
 import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Union
+from collections import Counter
+from typing import Optional, List, Dict, Any, Union, Tuple
 from .connection import db_connection
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _JsonDumps(value) -> str:
+    """序列化为JSON字符串，安装了orjson时使用orjson"""
+    if HAS_ORJSON:
+        # 驱动需要str，bytes会以二进制字符集发送而被JSON列拒绝
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(value)
+
+
+def _JsonLoads(value):
+    """解析JSON字符串，安装了orjson时使用orjson（其异常类型是 json.JSONDecodeError 的子类）"""
+    if HAS_ORJSON:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def _JsonLoadsMany(values: List, fallback) -> List:
+    """批量解析JSON字符串，空值原样返回，无法解析的项替换为 fallback() 的结果
+    
+    安装了orjson时把所有非空值拼成一个JSON数组一次解析，
+    拼接结果无效或元素个数对不上时退回逐项解析
+    """
+    present = [value for value in values if value]
+    if HAS_ORJSON and present:
+        try:
+            decoded = orjson.loads(
+                b'[' + b','.join(v.encode() if isinstance(v, str) else v for v in present) + b']'
+            )
+        except orjson.JSONDecodeError:
+            decoded = None
+        if decoded is not None and len(decoded) == len(present):
+            items = iter(decoded)
+            return [next(items) if value else value for value in values]
+    
+    results = []
+    for value in values:
+        if value:
+            try:
+                value = _JsonLoads(value)
+            except json.JSONDecodeError:
+                value = fallback()
+        results.append(value)
+    return results
+
+
+def _NowIfMissing(kwargs: Dict[str, Any], *fields: str) -> Optional[str]:
+    """任一时间戳字段缺失时返回当前时间，供这些字段共用；全部给出时不取时间，返回None"""
+    if all(field in kwargs for field in fields):
+        return None
+    return datetime.now().isoformat()
 
 
 class KnowledgeBase:
     """知识库模型类"""
     
+    # 按文件文档表重新统计单个知识库的文件数量和向量数量，参数为 (知识库ID, 知识库ID, 知识库ID)
+    # vector_count 列不允许为NULL，但知识库没有文件时 SUM 仍返回NULL，因此保留 COALESCE
+    _UPDATE_COUNTS_SQL = """
+        UPDATE knowledge_bases 
+        SET file_count = (SELECT COUNT(*) FROM file_documents WHERE knowledge_base_id = %s),
+            vector_count = (SELECT COALESCE(SUM(vector_count), 0) FROM file_documents WHERE knowledge_base_id = %s),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+        """
+    # 按文件文档表重新统计全部知识库的计数
+    _RECONCILE_COUNTS_SQL = """
+        UPDATE knowledge_bases 
+        SET file_count = (SELECT COUNT(*) FROM file_documents WHERE knowledge_base_id = knowledge_bases.id),
+            vector_count = (SELECT COALESCE(SUM(vector_count), 0) FROM file_documents WHERE knowledge_base_id = knowledge_bases.id)
+        """
+    # 文件文档增删改时在同一事务中增量维护计数，避免每次都重新统计整个知识库
+    _ADJUST_COUNTS_SQL = """
+        UPDATE knowledge_bases 
+        SET file_count = file_count + %s, vector_count = vector_count + %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+        """
+    # 被删除或重新向量化的文件原有向量数取自数据库，而不是实例上可能过期的值
+    _ADJUST_COUNTS_REPLACING_SQL = """
+        UPDATE knowledge_bases 
+        SET file_count = file_count + %s,
+            vector_count = vector_count + %s - (SELECT vector_count FROM file_documents WHERE id = %s),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+        """
+    
+    # 允许通过 Update 修改的列，id和时间戳不可修改
+    _UPDATABLE = frozenset({
+        'name', 'description', 'file_count', 'vector_count', 'status',
+        'embedding_model', 'chunk_size', 'chunk_overlap',
+    })
+    # 按排序后的字段组合缓存 UPDATE 语句，字段只能取自 _UPDATABLE，组合数有限
+    _UPDATE_SQL: Dict[tuple, str] = {}
+    
+    __slots__ = (
+        'id', 'name', 'description', 'created_at', 'updated_at', 'file_count', 'vector_count',
+        'status', 'embedding_model', 'chunk_size', 'chunk_overlap',
+    )
+    
     def __init__(self, **kwargs):
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        # id和时间戳的默认值只在字段缺失时生成，从数据库行构造时不再白白计算
+        self.id = kwargs['id'] if 'id' in kwargs else uuid.uuid4().hex
         self.name = kwargs.get('name', '')
         self.description = kwargs.get('description', '')
-        self.created_at = kwargs.get('created_at', datetime.now().isoformat())
-        self.updated_at = kwargs.get('updated_at', datetime.now().isoformat())
+        now = _NowIfMissing(kwargs, 'created_at', 'updated_at')
+        self.created_at = kwargs.get('created_at', now)
+        self.updated_at = kwargs.get('updated_at', now)
         self.file_count = kwargs.get('file_count', 0)
         self.vector_count = kwargs.get('vector_count', 0)
         self.status = kwargs.get('status', 'active')
@@ -52,11 +155,23 @@ class KnowledgeBase:
     def GetById(cls, kb_id: str) -> Optional['KnowledgeBase']:
         """根据ID获取知识库"""
         sql = "SELECT * FROM knowledge_bases WHERE id = %s"
-        result = db_connection.ExecuteQuery(sql, (kb_id,))
+        # 短时缓存，对 knowledge_bases 的写操作会使其失效
+        result = db_connection.CachedQuery(sql, (kb_id,))
         if result:
             return cls(**result[0])
         return None
     
+    @classmethod
+    def GetByIds(cls, kb_ids: List[str]) -> Dict[str, 'KnowledgeBase']:
+        """一次查询获取多个知识库，返回以ID为键的字典，不存在的ID不在结果中"""
+        kb_ids = list(dict.fromkeys(kb_ids))
+        if not kb_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(kb_ids))
+        sql = f"SELECT * FROM knowledge_bases WHERE id IN ({placeholders})"
+        results = db_connection.ExecuteQuery(sql, tuple(kb_ids))
+        return {row['id']: cls(**row) for row in results}
+    
     @classmethod
     def GetAll(cls) -> List['KnowledgeBase']:
         """获取所有知识库"""
@@ -73,20 +188,23 @@ class KnowledgeBase:
     
     def Update(self, **kwargs) -> bool:
         """更新知识库信息"""
-        update_fields = []
-        params = []
-        
-        for field, value in kwargs.items():
-            if hasattr(self, field) and field != 'id':
-                update_fields.append(f"{field} = %s")
-                params.append(value)
-                setattr(self, field, value)
-        
-        if not update_fields:
+        fields = tuple(sorted(field for field in kwargs if field in self._UPDATABLE))
+        if not fields:
             return False
         
+        params = []
+        for field in fields:
+            value = kwargs[field]
+            params.append(value)
+            setattr(self, field, value)
         params.append(self.id)
-        sql = f"UPDATE knowledge_bases SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP WHERE id = %s"
+        
+        sql = self._UPDATE_SQL.get(fields)
+        if sql is None:
+            sql = self._UPDATE_SQL[fields] = (
+                f"UPDATE knowledge_bases SET {', '.join(f'{field} = %s' for field in fields)}, "
+                "updated_at = CURRENT_TIMESTAMP WHERE id = %s"
+            )
         return db_connection.ExecuteUpdate(sql, tuple(params)) > 0
     
     def Delete(self) -> bool:
@@ -94,39 +212,32 @@ class KnowledgeBase:
         sql = "DELETE FROM knowledge_bases WHERE id = %s"
         return db_connection.ExecuteUpdate(sql, (self.id,)) > 0
     
-    def UpdateFileCount(self) -> bool:
-        """更新文件数量"""
-        sql = """
-        UPDATE knowledge_bases 
-        SET file_count = (SELECT COUNT(*) FROM file_documents WHERE knowledge_base_id = %s),
-            updated_at = CURRENT_TIMESTAMP
-        WHERE id = %s
+    @classmethod
+    def AdjustCounts(cls, kb_id: str, file_delta: int = 0, vector_delta: int = 0,
+                     file_id: Optional[str] = None, cursor=None) -> bool:
+        """按增量调整知识库的文件数量和向量数量，单条语句完成，不重新统计
+        
+        给出 file_id 时还会减去该文件当前在数据库中的向量数量，供删除或重新向量化文件时使用。
+        给出 cursor 时在调用方的事务中执行，由调用方负责提交。
         """
-        result = db_connection.ExecuteUpdate(sql, (self.id, self.id)) > 0
-        if result:
-            # 重新获取文件数量
-            sql = "SELECT file_count FROM knowledge_bases WHERE id = %s"
-            result = db_connection.ExecuteQuery(sql, (self.id,))
-            if result:
-                self.file_count = result[0]['file_count']
-        return result
-    
-    def UpdateVectorCount(self) -> bool:
-        """更新向量数量"""
-        sql = """
-        UPDATE knowledge_bases 
-        SET vector_count = (SELECT COALESCE(SUM(vector_count), 0) FROM file_documents WHERE knowledge_base_id = %s),
-            updated_at = CURRENT_TIMESTAMP
-        WHERE id = %s
+        if file_id is None:
+            sql, params = cls._ADJUST_COUNTS_SQL, (file_delta, vector_delta, kb_id)
+        else:
+            sql, params = cls._ADJUST_COUNTS_REPLACING_SQL, (file_delta, vector_delta, file_id, kb_id)
+        if cursor is not None:
+            return cursor.execute(sql, params) > 0
+        return db_connection.ExecuteUpdate(sql, params) > 0
+    
+    @classmethod
+    def Reconcile(cls, kb_id: Optional[str] = None) -> int:
+        """按文件文档表重新统计知识库的计数以修正增量维护产生的偏差
+        
+        指定 kb_id 时只修正该知识库，否则修正全部知识库，后者代价较高，应低频执行。
+        返回受影响的行数，MySQL 下即计数确有偏差而被修正的知识库数量
         """
-        result = db_connection.ExecuteUpdate(sql, (self.id, self.id)) > 0
-        if result:
-            # 重新获取向量数量
-            sql = "SELECT vector_count FROM knowledge_bases WHERE id = %s"
-            result = db_connection.ExecuteQuery(sql, (self.id,))
-            if result:
-                self.vector_count = result[0]['vector_count']
-        return result
+        if kb_id is not None:
+            return db_connection.ExecuteUpdate(cls._UPDATE_COUNTS_SQL, (kb_id, kb_id, kb_id))
+        return db_connection.ExecuteUpdate(cls._RECONCILE_COUNTS_SQL)
     
     def ToDict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -145,15 +256,90 @@ class KnowledgeBase:
         }
 
 
+# 文件文档列表的可选筛选条件（按位掩码顺序）与允许的排序字段
+_FILE_LIST_FILTERS = ("knowledge_base_id = %s", "status = %s", "type LIKE %s", "name LIKE %s")
+_FILE_LIST_SORT_FIELDS = ("uploaded_at", "name", "size", "vector_count", "status")
+# 列表查询默认不读取可能很大的 metadata JSON 列，需要时显式选取完整列
+_FILE_LIGHT_COLUMNS = (
+    "id, name, type, size, uploaded_at, status, knowledge_base_id, vector_count, "
+    "last_vectorized_at, error_message, file_path, suffix"
+)
+_FILE_FULL_COLUMNS = f"{_FILE_LIGHT_COLUMNS}, metadata"
+
+
+def _BuildFileListTemplates():
+    """预生成所有 (筛选条件组合, 排序字段, 排序方向, 是否包含元数据) 的查询语句"""
+    templates = {}
+    for mask in range(1 << len(_FILE_LIST_FILTERS)):
+        where_clause = " AND ".join(
+            cond for bit, cond in enumerate(_FILE_LIST_FILTERS) if mask & (1 << bit)
+        ) or "1=1"
+        for sort_by in _FILE_LIST_SORT_FIELDS:
+            for sort_order in ("asc", "desc"):
+                for include_metadata in (False, True):
+                    columns = _FILE_FULL_COLUMNS if include_metadata else _FILE_LIGHT_COLUMNS
+                    sql = (f"SELECT {columns} FROM file_documents WHERE {where_clause} "
+                           f"ORDER BY {sort_by} {sort_order.upper()}")
+                    templates[(mask, sort_by, sort_order, include_metadata)] = (
+                        where_clause, sql, f"{sql} LIMIT %s OFFSET %s"
+                    )
+    return templates
+
+
+_FILE_LIST_SQL = _BuildFileListTemplates()
+
+# 游标分页的排序字段，status 为ENUM，排序按枚举序号而比较按字符串，不能用作游标
+_FILE_KEYSET_SORT_FIELDS = ("uploaded_at", "name", "size", "vector_count")
+
+
+def _BuildFileKeysetTemplates():
+    """预生成游标分页的 (首页, 后续页) 查询语句，以 (排序字段, id) 作为游标保证顺序唯一"""
+    templates = {}
+    for (mask, sort_by, sort_order, include_metadata), (where_clause, _, _) in _FILE_LIST_SQL.items():
+        if sort_by not in _FILE_KEYSET_SORT_FIELDS:
+            continue
+        columns = _FILE_FULL_COLUMNS if include_metadata else _FILE_LIGHT_COLUMNS
+        direction = sort_order.upper()
+        order_clause = f"ORDER BY {sort_by} {direction}, id {direction} LIMIT %s"
+        seek = "<" if sort_order == "desc" else ">"
+        templates[(mask, sort_by, sort_order, include_metadata)] = (
+            f"SELECT {columns} FROM file_documents WHERE {where_clause} {order_clause}",
+            f"SELECT {columns} FROM file_documents WHERE {where_clause} "
+            f"AND ({sort_by}, id) {seek} (%s, %s) {order_clause}",
+        )
+    return templates
+
+
+_FILE_KEYSET_SQL = _BuildFileKeysetTemplates()
+
+
 class FileDocument:
     """文件文档模型类"""
     
+    _INSERT_SQL = """
+        INSERT INTO file_documents (id, name, type, size, knowledge_base_id, file_path, suffix, metadata)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+    
+    # 允许通过 Update 修改的列，id和上传时间不可修改
+    _UPDATABLE = frozenset({
+        'name', 'type', 'size', 'status', 'knowledge_base_id', 'vector_count',
+        'last_vectorized_at', 'error_message', 'file_path', 'suffix', 'metadata',
+    })
+    _UPDATE_SQL: Dict[tuple, str] = {}
+    
+    __slots__ = (
+        'id', 'name', 'type', 'size', 'uploaded_at', 'status', 'knowledge_base_id', 'vector_count',
+        'last_vectorized_at', 'error_message', 'file_path', 'suffix', '_metadata', '_metadata_parsed',
+    )
+    
     def __init__(self, **kwargs):
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        # id和时间戳的默认值只在字段缺失时生成，从数据库行构造时不再白白计算
+        self.id = kwargs['id'] if 'id' in kwargs else uuid.uuid4().hex
         self.name = kwargs.get('name', '')
         self.type = kwargs.get('type', '')
         self.size = kwargs.get('size', 0)
-        self.uploaded_at = kwargs.get('uploaded_at', datetime.now().isoformat())
+        self.uploaded_at = kwargs['uploaded_at'] if 'uploaded_at' in kwargs else datetime.now().isoformat()
         self.status = kwargs.get('status', 'uploaded')
         self.knowledge_base_id = kwargs.get('knowledge_base_id', '')
         self.vector_count = kwargs.get('vector_count', 0)
@@ -163,13 +349,34 @@ class FileDocument:
         self.suffix = kwargs.get('suffix', '')
         self.metadata = kwargs.get('metadata', {})
     
+    @property
+    def metadata(self):
+        """文件元数据，数据库中读出的JSON字符串在首次访问时才解析"""
+        if not self._metadata_parsed:
+            if self._metadata:
+                self._metadata = _JsonLoads(self._metadata)
+            self._metadata_parsed = True
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+        self._metadata_parsed = not isinstance(value, (str, bytes))
+    
+    @classmethod
+    def LoadMetadata(cls, docs: List['FileDocument']):
+        """一次性解析一批文件文档中尚未解析的元数据，适合随后要全部序列化的列表"""
+        pending = [doc for doc in docs if not doc._metadata_parsed]
+        decoded = _JsonLoadsMany([doc._metadata for doc in pending], dict)
+        for doc, value in zip(pending, decoded):
+            doc.metadata = value
+    
     @classmethod
     def Create(cls, name: str, file_type: str, size: int, knowledge_base_id: str, 
-               file_path: str, suffix: Optional[str] = None, metadata: Optional[Dict] = None) -> 'FileDocument':
-        """创建新的文件文档"""
+               file_path: str, suffix: Optional[str] = None, metadata: Optional[Dict] = None) -> Optional['FileDocument']:
+        """创建新的文件文档，失败时整体回滚并返回None"""
         # 如果没有提供suffix，从文件名中提取
         if suffix is None:
-            import os
             suffix = os.path.splitext(name)[1].lower()
         
         doc = cls(
@@ -182,132 +389,230 @@ class FileDocument:
             metadata=metadata or {}
         )
         
-        sql = """
-        INSERT INTO file_documents (id, name, type, size, knowledge_base_id, file_path, suffix, metadata)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        db_connection.ExecuteInsert(sql, (
-            doc.id, doc.name, doc.type, doc.size, doc.knowledge_base_id, 
-            doc.file_path, doc.suffix, json.dumps(doc.metadata)
-        ))
-        
-        # 更新知识库的文件数量
-        kb = KnowledgeBase.GetById(knowledge_base_id)
-        if kb:
-            kb.UpdateFileCount()
+        # 插入文件并在同一事务中将知识库的文件数量加一
+        try:
+            with db_connection.TransactionCursor() as cursor:
+                cursor.execute(cls._INSERT_SQL, doc._InsertParams())
+                KnowledgeBase.AdjustCounts(knowledge_base_id, file_delta=1, cursor=cursor)
+        except Exception:
+            return None
         
         return doc
     
+    @classmethod
+    def CreateMany(cls, records: List[Dict[str, Any]]) -> List['FileDocument']:
+        """批量创建文件文档
+        
+        records 中每项的键与 Create 的参数相同。所有记录在同一事务中一次批量插入，
+        并且每个涉及的知识库只更新一次文件数量。失败时整体回滚并返回空列表。
+        """
+        docs = []
+        for record in records:
+            suffix = record.get('suffix')
+            if suffix is None:
+                suffix = os.path.splitext(record['name'])[1].lower()
+            docs.append(cls(
+                name=record['name'],
+                type=record['file_type'],
+                size=record['size'],
+                knowledge_base_id=record['knowledge_base_id'],
+                file_path=record['file_path'],
+                suffix=suffix,
+                metadata=record.get('metadata') or {}
+            ))
+        if not docs:
+            return []
+        
+        try:
+            with db_connection.TransactionCursor() as cursor:
+                cursor.executemany(cls._INSERT_SQL, [doc._InsertParams() for doc in docs])
+                for kb_id, count in Counter(doc.knowledge_base_id for doc in docs).items():
+                    KnowledgeBase.AdjustCounts(kb_id, file_delta=count, cursor=cursor)
+        except Exception:
+            return []
+        return docs
+    
+    def _InsertParams(self) -> tuple:
+        """INSERT 语句的参数"""
+        return (
+            self.id, self.name, self.type, self.size, self.knowledge_base_id,
+            self.file_path, self.suffix, _JsonDumps(self.metadata)
+        )
+    
     @classmethod
     def GetById(cls, doc_id: str) -> Optional['FileDocument']:
         """根据ID获取文件文档"""
-        sql = "SELECT * FROM file_documents WHERE id = %s"
-        result = db_connection.ExecuteQuery(sql, (doc_id,))
+        sql = f"SELECT {_FILE_FULL_COLUMNS} FROM file_documents WHERE id = %s"
+        # 短时缓存，对 file_documents 的写操作会使其失效
+        result = db_connection.CachedQuery(sql, (doc_id,))
         if result:
-            row = result[0]
-            if row.get('metadata'):
-                row['metadata'] = json.loads(row['metadata'])
-            return cls(**row)
+            return cls(**result[0])
         return None
     
     @classmethod
-    def GetByKnowledgeBase(cls, knowledge_base_id: str, limit: int = 100, offset: int = 0) -> List['FileDocument']:
-        """根据知识库ID获取文件文档"""
-        sql = """
-        SELECT * FROM file_documents 
-        WHERE knowledge_base_id = %s 
-        ORDER BY uploaded_at DESC 
-        LIMIT %s OFFSET %s
-        """
+    def GetByIds(cls, doc_ids: List[str]) -> Dict[str, 'FileDocument']:
+        """一次查询获取多个文件文档，返回以ID为键的字典，不存在的ID不在结果中"""
+        doc_ids = list(dict.fromkeys(doc_ids))
+        if not doc_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(doc_ids))
+        sql = f"SELECT {_FILE_FULL_COLUMNS} FROM file_documents WHERE id IN ({placeholders})"
+        results = db_connection.ExecuteQuery(sql, tuple(doc_ids))
+        return {row['id']: cls(**row) for row in results}
+    
+    @classmethod
+    def GetByKnowledgeBase(cls, knowledge_base_id: str, limit: int = 100, offset: int = 0,
+                           include_metadata: bool = False) -> List['FileDocument']:
+        """根据知识库ID获取文件文档，include_metadata 为False时不读取元数据，实例的 metadata 为空字典"""
+        _, _, sql = _FILE_LIST_SQL[(1, "uploaded_at", "desc", include_metadata)]
         results = db_connection.ExecuteQuery(sql, (knowledge_base_id, limit, offset))
-        documents = []
-        for row in results:
-            if row.get('metadata'):
-                row['metadata'] = json.loads(row['metadata'])
-            documents.append(cls(**row))
-        return documents
+        return [cls(**row) for row in results]
     
     @classmethod
-    def GetAll(cls, limit: int = 100, offset: int = 0, status: Optional[str] = None, 
-               file_type: Optional[str] = None, search: Optional[str] = None,
-               sort_by: str = "uploaded_at", sort_order: str = "desc", knowledge_base_id: Optional[str] = None,
-               file_ids: Optional[List[str]] = None) -> List['FileDocument']:
-        """获取所有文件文档，支持筛选"""
-        conditions = []
+    def IterByKnowledgeBase(cls, knowledge_base_id: str, include_metadata: bool = False):
+        """流式遍历知识库下的全部文件文档，逐行构造实例，不一次性加载全部结果"""
+        _, sql, _ = _FILE_LIST_SQL[(1, "uploaded_at", "desc", include_metadata)]
+        for row in db_connection.StreamQuery(sql, (knowledge_base_id,)):
+            yield cls(**row)
+    
+    @staticmethod
+    def _ListFilters(status: Optional[str], file_type: Optional[str], search: Optional[str],
+                     knowledge_base_id: Optional[str]):
+        """计算筛选条件组合的位掩码和对应参数，位的顺序与 _FILE_LIST_FILTERS 一致"""
+        mask = 0
         params = []
+        filters = (
+            knowledge_base_id,
+            status,
+            f"%{file_type}%" if file_type else None,
+            f"%{search}%" if search else None,
+        )
+        for bit, value in enumerate(filters):
+            if value:
+                mask |= 1 << bit
+                params.append(value)
+        return mask, params
+    
+    @staticmethod
+    def _BuildListQuery(status: Optional[str] = None, file_type: Optional[str] = None,
+                        search: Optional[str] = None, sort_by: str = "uploaded_at", sort_order: str = "desc",
+                        knowledge_base_id: Optional[str] = None, file_ids: Optional[List[str]] = None,
+                        paged: bool = False, include_metadata: bool = False):
+        """选取预生成的带筛选和排序的文件文档查询，返回 (sql, params)"""
+        mask, params = FileDocument._ListFilters(status, file_type, search, knowledge_base_id)
+        
+        if sort_by not in _FILE_LIST_SORT_FIELDS:
+            sort_by = "uploaded_at"
+        if sort_order not in ["asc", "desc"]:
+            sort_order = "desc"
         
-        if knowledge_base_id:
-            conditions.append("knowledge_base_id = %s")
-            params.append(knowledge_base_id)
-        if status:
-            conditions.append("status = %s")
-            params.append(status)
-        if file_type:
-            conditions.append("type LIKE %s")
-            params.append(f"%{file_type}%")
-        if search:
-            conditions.append("name LIKE %s")
-            params.append(f"%{search}%")
+        where_clause, sql, paged_sql = _FILE_LIST_SQL[(mask, sort_by, sort_order, include_metadata)]
         if file_ids and len(file_ids) > 0:
+            # ID列表长度不固定，只能按需拼接
             placeholders = ", ".join(["%s"] * len(file_ids))
-            conditions.append(f"id IN ({placeholders})")
+            columns = _FILE_FULL_COLUMNS if include_metadata else _FILE_LIGHT_COLUMNS
+            sql = (f"SELECT {columns} FROM file_documents WHERE {where_clause} AND id IN ({placeholders}) "
+                   f"ORDER BY {sort_by} {sort_order.upper()}")
+            paged_sql = f"{sql} LIMIT %s OFFSET %s"
             params.extend(file_ids)
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
+        return (paged_sql if paged else sql), params
+    
+    @classmethod
+    def GetAll(cls, limit: int = 100, offset: int = 0, status: Optional[str] = None, 
+               file_type: Optional[str] = None, search: Optional[str] = None,
+               sort_by: str = "uploaded_at", sort_order: str = "desc", knowledge_base_id: Optional[str] = None,
+               file_ids: Optional[List[str]] = None, include_metadata: bool = False) -> List['FileDocument']:
+        """获取所有文件文档，支持筛选，include_metadata 为False时不读取元数据，实例的 metadata 为空字典"""
+        sql, params = cls._BuildListQuery(
+            status, file_type, search, sort_by, sort_order, knowledge_base_id, file_ids,
+            paged=True, include_metadata=include_metadata
+        )
+        params.extend([limit, offset])
+        results = db_connection.ExecuteQuery(sql, tuple(params))
+        return [cls(**row) for row in results]
+    
+    @classmethod
+    def GetPage(cls, cursor: Optional[tuple] = None, limit: int = 100, status: Optional[str] = None,
+                file_type: Optional[str] = None, search: Optional[str] = None,
+                sort_by: str = "uploaded_at", sort_order: str = "desc",
+                knowledge_base_id: Optional[str] = None,
+                include_metadata: bool = False) -> Tuple[List['FileDocument'], Optional[tuple]]:
+        """按游标分页获取文件文档，翻页代价与页码无关
         
-        allowed_sort_fields = ["uploaded_at", "name", "size", "vector_count", "status"]
-        if sort_by not in allowed_sort_fields:
+        cursor 为上一页返回的游标，首页传None。返回 (文件列表, 下一页游标)，
+        没有更多数据时游标为None。不支持按 status 排序，此时按上传时间排序。
+        """
+        mask, params = cls._ListFilters(status, file_type, search, knowledge_base_id)
+        if sort_by not in _FILE_KEYSET_SORT_FIELDS:
             sort_by = "uploaded_at"
         if sort_order not in ["asc", "desc"]:
             sort_order = "desc"
         
-        sql = f"""
-        SELECT * FROM file_documents 
-        WHERE {where_clause}
-        ORDER BY {sort_by} {sort_order.upper()}
-        LIMIT %s OFFSET %s
-        """
-        params.extend([limit, offset])
+        first_sql, next_sql = _FILE_KEYSET_SQL[(mask, sort_by, sort_order, include_metadata)]
+        if cursor is None:
+            sql = first_sql
+        else:
+            sql = next_sql
+            params.extend(cursor)
+        params.append(limit)
+        
         results = db_connection.ExecuteQuery(sql, tuple(params))
-        documents = []
-        for row in results:
-            if row.get('metadata'):
-                row['metadata'] = json.loads(row['metadata'])
-            documents.append(cls(**row))
-        return documents
+        docs = [cls(**row) for row in results]
+        next_cursor = None
+        if len(docs) == limit:
+            last = results[-1]
+            next_cursor = (last[sort_by], last['id'])
+        return docs, next_cursor
+    
+    @classmethod
+    def IterAll(cls, status: Optional[str] = None, file_type: Optional[str] = None,
+                search: Optional[str] = None, sort_by: str = "uploaded_at", sort_order: str = "desc",
+                knowledge_base_id: Optional[str] = None, file_ids: Optional[List[str]] = None,
+                include_metadata: bool = False):
+        """流式遍历符合筛选条件的全部文件文档，使用服务端游标逐行读取
+        
+        迭代期间占用一个数据库连接，调用方提前结束时应关闭生成器
+        """
+        sql, params = cls._BuildListQuery(
+            status, file_type, search, sort_by, sort_order, knowledge_base_id, file_ids,
+            include_metadata=include_metadata
+        )
+        for row in db_connection.StreamQuery(sql, tuple(params)):
+            yield cls(**row)
     
     def Update(self, **kwargs) -> bool:
         """更新文件文档信息"""
-        update_fields = []
-        params = []
-        
-        for field, value in kwargs.items():
-            if hasattr(self, field) and field != 'id':
-                if field == 'metadata' and isinstance(value, dict):
-                    value = json.dumps(value)
-                update_fields.append(f"{field} = %s")
-                params.append(value)
-                setattr(self, field, value)
-        
-        if not update_fields:
+        fields = tuple(sorted(field for field in kwargs if field in self._UPDATABLE))
+        if not fields:
             return False
         
+        params = []
+        for field in fields:
+            value = kwargs[field]
+            if field == 'metadata' and isinstance(value, dict):
+                value = _JsonDumps(value)
+            params.append(value)
+            setattr(self, field, value)
         params.append(self.id)
-        sql = f"UPDATE file_documents SET {', '.join(update_fields)} WHERE id = %s"
+        
+        sql = self._UPDATE_SQL.get(fields)
+        if sql is None:
+            sql = self._UPDATE_SQL[fields] = (
+                f"UPDATE file_documents SET {', '.join(f'{field} = %s' for field in fields)} WHERE id = %s"
+            )
         return db_connection.ExecuteUpdate(sql, tuple(params)) > 0
     
     def Delete(self) -> bool:
         """删除文件文档"""
-        sql = "DELETE FROM file_documents WHERE id = %s"
-        result = db_connection.ExecuteUpdate(sql, (self.id,)) > 0
-        
-        if result:
-            # 更新知识库的文件数量和向量数量
-            kb = KnowledgeBase.GetById(self.knowledge_base_id)
-            if kb:
-                kb.UpdateFileCount()
-                kb.UpdateVectorCount()
-        
-        return result
+        # 先按文件原有向量数扣减知识库计数再删除文件，文件不存在时整体回滚
+        try:
+            with db_connection.TransactionCursor() as cursor:
+                KnowledgeBase.AdjustCounts(self.knowledge_base_id, file_delta=-1, file_id=self.id, cursor=cursor)
+                if cursor.execute("DELETE FROM file_documents WHERE id = %s", (self.id,)) == 0:
+                    raise LookupError(f"文件文档不存在: {self.id}")
+        except Exception:
+            return False
+        return True
     
     def UpdateStatus(self, status: str, error_message: Optional[str] = None) -> bool:
         """更新文件状态"""
@@ -329,15 +634,55 @@ class FileDocument:
         SET vector_count = %s, last_vectorized_at = CURRENT_TIMESTAMP, status = 'vectorized', error_message = NULL
         WHERE id = %s
         """
-        result = db_connection.ExecuteUpdate(sql, (vector_count, self.id)) > 0
+        # 先按新旧向量数之差调整知识库计数再更新文件，文件不存在时整体回滚
+        try:
+            with db_connection.TransactionCursor() as cursor:
+                KnowledgeBase.AdjustCounts(
+                    self.knowledge_base_id, vector_delta=vector_count, file_id=self.id, cursor=cursor
+                )
+                if cursor.execute(sql, (vector_count, self.id)) == 0:
+                    raise LookupError(f"文件文档不存在: {self.id}")
+        except Exception:
+            return False
+        return True
+    
+    @classmethod
+    def UpdateVectorizationBulk(cls, updates: List[tuple]) -> bool:
+        """批量更新向量化信息
         
-        if result:
-            # 更新知识库的向量数量
-            kb = KnowledgeBase.GetById(self.knowledge_base_id)
-            if kb:
-                kb.UpdateVectorCount()
+        updates 为 (文件ID, 向量数量) 列表。先锁定并读取这些文件原有的向量数量，
+        再用一条语句更新全部文件，并对每个涉及的知识库调整一次向量数量，均在同一事务中执行。
+        已不存在的文件会被跳过，失败时整体回滚并返回False。
+        """
+        vector_counts = dict(updates)
+        if not vector_counts:
+            return True
+        
+        id_list = ", ".join(["%s"] * len(vector_counts))
+        ids = tuple(vector_counts)
+        case_sql = "CASE id " + "WHEN %s THEN %s " * len(vector_counts) + "END"
+        case_params = tuple(value for item in vector_counts.items() for value in item)
         
-        return result
+        select_sql = (f"SELECT id, knowledge_base_id, vector_count FROM file_documents "
+                      f"WHERE id IN ({id_list}) FOR UPDATE")
+        file_sql = f"""
+        UPDATE file_documents 
+        SET vector_count = {case_sql}, last_vectorized_at = CURRENT_TIMESTAMP, status = 'vectorized', error_message = NULL
+        WHERE id IN ({id_list})
+        """
+        try:
+            with db_connection.TransactionCursor() as cursor:
+                cursor.execute(select_sql, ids)
+                deltas = Counter()
+                for row in cursor.fetchall():
+                    deltas[row['knowledge_base_id']] += vector_counts[row['id']] - (row['vector_count'] or 0)
+                cursor.execute(file_sql, case_params + ids)
+                for kb_id, delta in deltas.items():
+                    if delta:
+                        KnowledgeBase.AdjustCounts(kb_id, vector_delta=delta, cursor=cursor)
+        except Exception:
+            return False
+        return True
     
     def ToDict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -358,17 +703,68 @@ class FileDocument:
         } 
 
 
+_EXPLORATION_LIST_FILTERS = ("user_id = %s", "type LIKE %s", "name LIKE %s")
+_EXPLORATION_SORT_FIELDS = ("created_at", "updated_at", "name", "size", "last_accessed_at")
+# 列表查询默认不读取可能很大的预览数据和数据洞察列
+_EXPLORATION_LIST_COLUMNS = (
+    "id, name, type, size, user_id, created_at, updated_at, file_path, status, suffix, "
+    "metadata, last_accessed_at"
+)
+
+
+def _BuildExplorationTemplates():
+    """预生成数据探索文件的列表查询（按筛选条件组合、排序字段、排序方向、是否包含预览数据、
+    是否包含数据洞察）和计数查询（按筛选条件组合）"""
+    list_templates = {}
+    count_templates = {}
+    for mask in range(1 << len(_EXPLORATION_LIST_FILTERS)):
+        where_clause = " AND ".join(
+            ["status = 'active'"]
+            + [cond for bit, cond in enumerate(_EXPLORATION_LIST_FILTERS) if mask & (1 << bit)]
+        )
+        count_templates[mask] = f"SELECT COUNT(*) as count FROM file_exploration WHERE {where_clause}"
+        for sort_by in _EXPLORATION_SORT_FIELDS:
+            for sort_order in ("asc", "desc"):
+                for include_preview in (False, True):
+                    for include_insights in (False, True):
+                        columns = _EXPLORATION_LIST_COLUMNS
+                        if include_preview:
+                            columns += ", preview_data"
+                        if include_insights:
+                            columns += ", data_insights"
+                        list_templates[(mask, sort_by, sort_order, include_preview, include_insights)] = (
+                            f"SELECT {columns} FROM file_exploration WHERE {where_clause} "
+                            f"ORDER BY {sort_by} {sort_order.upper()} LIMIT %s OFFSET %s"
+                        )
+    return list_templates, count_templates
+
+
+_EXPLORATION_LIST_SQL, _EXPLORATION_COUNT_SQL = _BuildExplorationTemplates()
+
+
 class FileExploration:
     """数据探索临时文件模型类"""
     
+    _INSERT_SQL = """
+        INSERT INTO file_exploration (id, name, type, size, user_id, file_path, suffix, metadata, preview_data)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+    
+    # 允许通过 Update 修改的列，id和时间戳不可修改
+    _UPDATABLE = frozenset({
+        'name', 'type', 'size', 'user_id', 'file_path', 'status', 'suffix',
+        'metadata', 'preview_data', 'data_insights', 'last_accessed_at',
+    })
+    
     def __init__(self, **kwargs):
         self.id = kwargs.get('id', str(uuid.uuid4()))
         self.name = kwargs.get('name', '')
         self.type = kwargs.get('type', '')  # 文件类型，如csv, excel, json等
         self.size = kwargs.get('size', 0)  # 文件大小，以字节为单位
         self.user_id = kwargs.get('user_id', '')  # 上传用户ID
-        self.created_at = kwargs.get('created_at', datetime.now().isoformat())
-        self.updated_at = kwargs.get('updated_at', datetime.now().isoformat())
+        now = _NowIfMissing(kwargs, 'created_at', 'updated_at')
+        self.created_at = kwargs.get('created_at', now)
+        self.updated_at = kwargs.get('updated_at', now)
         self.file_path = kwargs.get('file_path', '')  # 文件存储路径
         self.status = kwargs.get('status', 'active')  # 文件状态：active, deleted
         self.suffix = kwargs.get('suffix', '')  # 文件扩展名
@@ -384,7 +780,6 @@ class FileExploration:
         """创建新的数据探索文件"""
         # 如果没有提供suffix，从文件名中提取
         if suffix is None:
-            import os
             suffix = os.path.splitext(name)[1].lower()
         
         file = cls(
@@ -398,20 +793,51 @@ class FileExploration:
             preview_data=preview_data or []
         )
         
-        # 将preview_data转换为有效的JSON
-        preview_data_json = json.dumps(file.preview_data if file.preview_data else [])
+        db_connection.ExecuteInsert(cls._INSERT_SQL, file._InsertParams())
         
-        sql = """
-        INSERT INTO file_exploration (id, name, type, size, user_id, file_path, suffix, metadata, preview_data)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        return file
+    
+    @classmethod
+    def CreateMany(cls, records: List[Dict[str, Any]]) -> List['FileExploration']:
+        """批量创建数据探索文件
+        
+        records 中每项的键与 Create 的参数相同，所有记录在同一事务中一次批量插入。
+        失败时整体回滚并返回空列表。
         """
-        db_connection.ExecuteInsert(sql, (
-            file.id, file.name, file.type, file.size, file.user_id, 
-            file.file_path, file.suffix, json.dumps(file.metadata), 
-            preview_data_json
-        ))
+        files = []
+        for record in records:
+            suffix = record.get('suffix')
+            if suffix is None:
+                suffix = os.path.splitext(record['name'])[1].lower()
+            files.append(cls(
+                name=record['name'],
+                type=record['file_type'],
+                size=record['size'],
+                user_id=record['user_id'],
+                file_path=record['file_path'],
+                suffix=suffix,
+                metadata=record.get('metadata') or {},
+                preview_data=record.get('preview_data') or []
+            ))
+        if not files:
+            return []
         
-        return file
+        try:
+            with db_connection.TransactionCursor() as cursor:
+                cursor.executemany(cls._INSERT_SQL, [file._InsertParams() for file in files])
+        except Exception:
+            return []
+        return files
+    
+    def _InsertParams(self) -> tuple:
+        """INSERT 语句的参数"""
+        # 将preview_data转换为有效的JSON
+        preview_data_json = _JsonDumps(self.preview_data if self.preview_data else [])
+        return (
+            self.id, self.name, self.type, self.size, self.user_id,
+            self.file_path, self.suffix, _JsonDumps(self.metadata),
+            preview_data_json
+        )
     
     @classmethod
     def GetById(cls, file_id: str) -> Optional['FileExploration']:
@@ -424,14 +850,14 @@ class FileExploration:
                 # 解析JSON字段
                 if row.get('metadata'):
                     try:
-                        row['metadata'] = json.loads(row['metadata'])
+                        row['metadata'] = _JsonLoads(row['metadata'])
                     except json.JSONDecodeError as e:
                         print(f"解析metadata字段时出错: {str(e)}")
                         row['metadata'] = {}
                 
                 if row.get('preview_data'):
                     try:
-                        row['preview_data'] = json.loads(row['preview_data'])
+                        row['preview_data'] = _JsonLoads(row['preview_data'])
                     except json.JSONDecodeError as e:
                         print(f"解析preview_data字段时出错: {str(e)}")
                         row['preview_data'] = []
@@ -440,7 +866,7 @@ class FileExploration:
                 
                 if row.get('data_insights'):
                     try:
-                        row['data_insights'] = json.loads(row['data_insights'])
+                        row['data_insights'] = _JsonLoads(row['data_insights'])
                     except json.JSONDecodeError as e:
                         print(f"解析data_insights字段时出错: {str(e)}")
                         row['data_insights'] = {}
@@ -460,79 +886,60 @@ class FileExploration:
                 return cls(**row)
         return None
     
+    @staticmethod
+    def _ListFilters(user_id: Optional[str], file_type: Optional[str], search: Optional[str]):
+        """计算筛选条件组合的位掩码和对应参数，位的顺序与 _EXPLORATION_LIST_FILTERS 一致"""
+        mask = 0
+        params = []
+        filters = (
+            user_id,
+            f"%{file_type}%" if file_type else None,
+            f"%{search}%" if search else None,
+        )
+        for bit, value in enumerate(filters):
+            if value is not None:
+                mask |= 1 << bit
+                params.append(value)
+        return mask, params
+    
     @classmethod
     def GetByUserId(cls, user_id: str, limit: int = 100, offset: int = 0, 
                     file_type: Optional[str] = None, search: Optional[str] = None,
-                    sort_by: str = "updated_at", sort_order: str = "desc") -> List['FileExploration']:
-        """根据用户ID获取文件列表"""
-        conditions = ["user_id = %s", "status = 'active'"]
-        params = [user_id]
-        
-        if file_type:
-            conditions.append("type LIKE %s")
-            params.append(f"%{file_type}%")
-        if search:
-            conditions.append("name LIKE %s")
-            params.append(f"%{search}%")
-        
-        where_clause = " AND ".join(conditions)
-        
-        allowed_sort_fields = ["created_at", "updated_at", "name", "size", "last_accessed_at"]
-        if sort_by not in allowed_sort_fields:
+                    sort_by: str = "updated_at", sort_order: str = "desc",
+                    include_preview: bool = False, include_insights: bool = False) -> List['FileExploration']:
+        """根据用户ID获取文件列表
+        
+        默认不读取预览数据和数据洞察，实例中对应字段为空，需要时通过 include_preview、include_insights 选取
+        """
+        # 始终按用户筛选，不能因 user_id 为空而退化为查询全部用户的文件
+        mask, params = cls._ListFilters(user_id or "", file_type, search)
+        
+        if sort_by not in _EXPLORATION_SORT_FIELDS:
             sort_by = "updated_at"
         if sort_order not in ["asc", "desc"]:
             sort_order = "desc"
         
-        sql = f"""
-        SELECT * FROM file_exploration 
-        WHERE {where_clause}
-        ORDER BY {sort_by} {sort_order.upper()}
-        LIMIT %s OFFSET %s
-        """
+        sql = _EXPLORATION_LIST_SQL[(mask, sort_by, sort_order, include_preview, include_insights)]
         params.extend([limit, offset])
         results = db_connection.ExecuteQuery(sql, tuple(params))
-        files = []
-        for row in results:
-            # 解析JSON字段
-            if row.get('metadata'):
-                try:
-                    row['metadata'] = json.loads(row['metadata'])
-                except json.JSONDecodeError:
-                    row['metadata'] = {}
-            if row.get('preview_data'):
-                try:
-                    row['preview_data'] = json.loads(row['preview_data'])
-                except json.JSONDecodeError:
-                    row['preview_data'] = []
-            if row.get('data_insights'):
-                try:
-                    row['data_insights'] = json.loads(row['data_insights'])
-                except json.JSONDecodeError:
-                    row['data_insights'] = {}
-            
-            files.append(cls(**row))
-        return files
+        # 按列批量解析JSON字段
+        json_fields = [('metadata', dict)]
+        if include_preview:
+            json_fields.append(('preview_data', list))
+        if include_insights:
+            json_fields.append(('data_insights', dict))
+        for field, fallback in json_fields:
+            decoded = _JsonLoadsMany([row.get(field) for row in results], fallback)
+            for row, value in zip(results, decoded):
+                row[field] = value
+        return [cls(**row) for row in results]
     
     @classmethod
     def Count(cls, user_id: Optional[str] = None, file_type: Optional[str] = None, 
               search: Optional[str] = None) -> int:
         """获取文件总数"""
-        conditions = ["status = 'active'"]
-        params = []
-        
-        if user_id:
-            conditions.append("user_id = %s")
-            params.append(user_id)
-        if file_type:
-            conditions.append("type LIKE %s")
-            params.append(f"%{file_type}%")
-        if search:
-            conditions.append("name LIKE %s")
-            params.append(f"%{search}%")
-        
-        where_clause = " AND ".join(conditions)
-        
-        sql = f"SELECT COUNT(*) as count FROM file_exploration WHERE {where_clause}"
+        mask, params = cls._ListFilters(user_id or None, file_type, search)
+        sql = _EXPLORATION_COUNT_SQL[mask]
         result = db_connection.ExecuteQuery(sql, tuple(params))
         return result[0]['count'] if result else 0
     
@@ -552,9 +959,9 @@ class FileExploration:
         params = []
         
         for field, value in kwargs.items():
-            if hasattr(self, field) and field != 'id':
+            if field in self._UPDATABLE:
                 if field in ['metadata', 'preview_data', 'data_insights'] and isinstance(value, dict):
-                    value = json.dumps(value)
+                    value = _JsonDumps(value)
                 update_fields.append(f"{field} = %s")
                 params.append(value)
                 setattr(self, field, value)
@@ -578,7 +985,7 @@ class FileExploration:
             self.data_insights = insights
             
             # 尝试将insights转换为JSON，验证其可序列化性
-            insights_json = json.dumps(insights)
+            insights_json = _JsonDumps(insights)
             
             sql = """
             UPDATE file_exploration 
@@ -610,7 +1017,7 @@ class FileExploration:
         SET preview_data = %s, updated_at = CURRENT_TIMESTAMP
         WHERE id = %s
         """
-        return db_connection.ExecuteUpdate(sql, (json.dumps(preview_data), self.id)) > 0
+        return db_connection.ExecuteUpdate(sql, (_JsonDumps(preview_data), self.id)) > 0
     
     def Delete(self) -> bool:
         """删除文件（标记为已删除）"""
@@ -673,8 +1080,9 @@ class DataSource:
         self.ssl_cert = kwargs.get('ssl_cert', '')
         self.ssl_key = kwargs.get('ssl_key', '')
         self.status = kwargs.get('status', 'inactive')  # inactive, active, error
-        self.created_at = kwargs.get('created_at', datetime.now().isoformat())
-        self.updated_at = kwargs.get('updated_at', datetime.now().isoformat())
+        now = _NowIfMissing(kwargs, 'created_at', 'updated_at')
+        self.created_at = kwargs.get('created_at', now)
+        self.updated_at = kwargs.get('updated_at', now)
         self.last_connected_at = kwargs.get('last_connected_at', None)
         self.error_message = kwargs.get('error_message', '')
     
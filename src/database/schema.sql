@@ -0,0 +1,104 @@
+-- Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+-- SPDX-License-Identifier: MIT
+
+-- IASMind 数据库表结构，按外键依赖顺序排列
+-- 可由 DatabaseConnection.InitializeTables 执行，也可直接用 mysql 客户端导入
+
+-- 创建知识库表
+CREATE TABLE IF NOT EXISTS knowledge_bases (
+    id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    file_count INT NOT NULL DEFAULT 0,
+    vector_count INT NOT NULL DEFAULT 0,
+    status ENUM('active', 'inactive', 'processing') DEFAULT 'active',
+    embedding_model VARCHAR(100) DEFAULT 'text-embedding-3-small',
+    chunk_size INT DEFAULT 1000,
+    chunk_overlap INT DEFAULT 200,
+    INDEX idx_status_created (status, created_at),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 创建文件文档表
+CREATE TABLE IF NOT EXISTS file_documents (
+    id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    type VARCHAR(100) NOT NULL,
+    size BIGINT NOT NULL,
+    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status ENUM('uploaded', 'processing', 'vectorized', 'failed') DEFAULT 'uploaded',
+    knowledge_base_id VARCHAR(36) NOT NULL,
+    vector_count INT NOT NULL DEFAULT 0,
+    last_vectorized_at TIMESTAMP NULL,
+    error_message TEXT,
+    file_path VARCHAR(500) NOT NULL,
+    suffix VARCHAR(20),
+    metadata JSON,
+    INDEX idx_kb_uploaded (knowledge_base_id, uploaded_at),
+    INDEX idx_kb_status_uploaded (knowledge_base_id, status, uploaded_at),
+    INDEX idx_status (status),
+    INDEX idx_uploaded_at (uploaded_at),
+    INDEX idx_type (type),
+    INDEX idx_suffix (suffix),
+    FOREIGN KEY (knowledge_base_id) REFERENCES knowledge_bases(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 创建数据探索文件表
+CREATE TABLE IF NOT EXISTS file_exploration (
+    id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    type VARCHAR(100) NOT NULL,
+    size BIGINT NOT NULL,
+    user_id VARCHAR(36) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    file_path VARCHAR(500) NOT NULL,
+    status ENUM('active', 'deleted') DEFAULT 'active',
+    suffix VARCHAR(20),
+    metadata JSON,
+    preview_data JSON,
+    data_insights JSON,
+    last_accessed_at TIMESTAMP NULL,
+    INDEX idx_user_status_updated (user_id, status, updated_at),
+    INDEX idx_status (status),
+    INDEX idx_created_at (created_at),
+    INDEX idx_updated_at (updated_at),
+    INDEX idx_type (type),
+    INDEX idx_suffix (suffix),
+    INDEX idx_last_accessed_at (last_accessed_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 创建数据源表
+CREATE TABLE IF NOT EXISTS data_sources (
+    id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    type ENUM('mysql', 'oracle') NOT NULL DEFAULT 'mysql',
+    host VARCHAR(255) NOT NULL,
+    port INT NOT NULL,
+    username VARCHAR(255) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    database_name VARCHAR(255) NOT NULL,
+    schema_name VARCHAR(255),
+    service_name VARCHAR(255),
+    `ssl` TINYINT(1) DEFAULT 0,
+    ssl_ca TEXT,
+    ssl_cert TEXT,
+    ssl_key TEXT,
+    status ENUM('inactive', 'active', 'error') DEFAULT 'inactive',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    last_connected_at TIMESTAMP NULL,
+    error_message TEXT,
+    INDEX idx_status (status),
+    INDEX idx_type (type),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 记录已应用的建表脚本指纹，未变化时跳过初始化
+CREATE TABLE IF NOT EXISTS _schema_meta (
+    meta_key VARCHAR(64) PRIMARY KEY,
+    meta_value VARCHAR(128) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
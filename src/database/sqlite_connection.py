@@ -0,0 +1,222 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+SQLite数据库连接，供开发和测试环境使用
+通过 IASMIND_DB_BACKEND=sqlite 启用，对外接口与 DatabaseConnection 一致
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+from .connection import (
+    DatabaseConnection, Cursor, _SCHEMA_SCRIPT, _SCHEMA_DIGEST, _SCHEMA_DIGEST_QUERY, _SCHEMA_DIGEST_SAVE
+)
+
+logger = logging.getLogger(__name__)
+
+# MySQL建表语句中SQLite不支持的部分
+_INDEX_LINE_RE = re.compile(r"^\s*INDEX\s+(\w+)\s*\(([^)]*)\),?\s*$", re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.IGNORECASE)
+_TABLE_NAME_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?", re.IGNORECASE)
+_SCHEMA_REWRITES = (
+    (re.compile(r"\bENUM\s*\([^)]*\)", re.IGNORECASE), "TEXT"),
+    (re.compile(r"\bJSON\b", re.IGNORECASE), "TEXT"),
+    (re.compile(r"\bTINYINT\s*\(1\)", re.IGNORECASE), "INTEGER"),
+    (re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP", re.IGNORECASE), ""),
+    (re.compile(r"\)\s*ENGINE=[^;]*$", re.IGNORECASE), ")"),
+    (re.compile(r",(\s*\))$"), r"\1"),
+)
+
+
+def _TranslateSchema(script: str):
+    """将MySQL建表脚本转换为SQLite语句列表，内联索引改为单独的 CREATE INDEX"""
+    lines = [line for line in script.splitlines() if not line.lstrip().startswith("--")]
+    statements = []
+    for stmt in "\n".join(lines).split(";"):
+        stmt = stmt.strip()
+        if not stmt:
+            continue
+        match = _TABLE_NAME_RE.search(stmt)
+        table = match.group(1) if match else None
+        indexes = []
+        body = []
+        for line in stmt.splitlines():
+            match = _INDEX_LINE_RE.match(line) if table else None
+            if match:
+                indexes.append(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{match.group(1)} ON {table} ({match.group(2)})"
+                )
+            else:
+                body.append(line)
+        stmt = "\n".join(body)
+        for pattern, replacement in _SCHEMA_REWRITES:
+            stmt = pattern.sub(replacement, stmt)
+        statements.append(stmt)
+        statements.extend(indexes)
+    return statements
+
+
+def _ConvertTimestamp(value: bytes):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_converter("TIMESTAMP", _ConvertTimestamp)
+
+
+class _SqliteCursor:
+    """将MySQL风格的 %s 占位符和字典行适配到sqlite3游标"""
+
+    def __init__(self, cursor, as_dict: bool):
+        self._cursor = cursor
+        self._as_dict = as_dict
+
+    @staticmethod
+    def _Sql(sql: str) -> str:
+        # SQLite 写事务本身串行执行，不支持也不需要 SELECT ... FOR UPDATE
+        return _FOR_UPDATE_RE.sub("", sql.replace("%s", "?"))
+
+    def _Row(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return dict(zip([d[0] for d in self._cursor.description], row))
+
+    def execute(self, sql: str, params=None):
+        self._cursor.execute(self._Sql(sql), params or ())
+        return self._cursor.rowcount
+
+    def executemany(self, sql: str, seq_of_params):
+        self._cursor.executemany(self._Sql(sql), seq_of_params)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._Row(self._cursor.fetchone())
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if not self._as_dict:
+            return rows
+        columns = [d[0] for d in self._cursor.description or ()]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._Row(row)
+
+    def nextset(self):
+        return None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SqliteConnection(DatabaseConnection):
+    """SQLite数据库连接，进程内共享一个连接并串行访问"""
+
+    __slots__ = ("sqlite_path", "_sqlite_connection", "_sqlite_lock")
+
+    def __init__(self):
+        super().__init__()
+        self.sqlite_path = os.getenv("SQLITE_DATABASE_PATH", ":memory:")
+        self._sqlite_connection = None
+        self._sqlite_lock = threading.RLock()
+
+    def GetConnection(self):
+        """获取共享的SQLite连接"""
+        if self._sqlite_connection is None:
+            with self._sqlite_lock:
+                if self._sqlite_connection is None:
+                    connection = sqlite3.connect(
+                        self.sqlite_path,
+                        detect_types=sqlite3.PARSE_DECLTYPES,
+                        check_same_thread=False,
+                        isolation_level=None
+                    )
+                    connection.execute("PRAGMA foreign_keys = ON")
+                    connection.create_function("NOW", 0, lambda: datetime.now().isoformat(" ", "seconds"))
+                    self._sqlite_connection = connection
+                    logger.info("SQLite数据库连接成功: %s", self.sqlite_path)
+        return self._sqlite_connection
+
+    def ReleaseConnection(self, connection):
+        pass
+
+    def CloseConnection(self):
+        """关闭SQLite连接"""
+        with self._sqlite_lock:
+            if self._sqlite_connection is not None:
+                self._sqlite_connection.close()
+                self._sqlite_connection = None
+                logger.info("SQLite数据库连接已关闭")
+
+    @contextmanager
+    def GetCursor(self, cursor_class=None):
+        """获取数据库游标的上下文管理器，默认返回字典行"""
+        if self.lazy_init_tables and not self._tables_initialized:
+            self.EnsureTables()
+        with self._sqlite_lock:
+            cursor = _SqliteCursor(self.GetConnection().cursor(), cursor_class is not Cursor)
+            try:
+                yield cursor
+            except Exception as e:
+                logger.error("数据库操作失败: %s", e)
+                raise
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def TransactionCursor(self, cursor_class=None):
+        """在显式事务中执行多条语句的游标上下文管理器，正常退出时提交，异常时回滚"""
+        with self.GetCursor(cursor_class) as cursor:
+            cursor.execute("BEGIN")
+            try:
+                yield cursor
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                self._InvalidateQueryCache("")
+
+    def ExecuteScript(self, sql: str):
+        """执行多条以分号分隔的语句"""
+        with self._sqlite_lock:
+            self.GetConnection().executescript(sql)
+
+    def _ReadSchemaDigest(self):
+        """读取已应用的建表脚本指纹，_schema_meta 表不存在时返回None"""
+        with self._sqlite_lock:
+            try:
+                row = self.GetConnection().execute(_SCHEMA_DIGEST_QUERY).fetchone()
+            except sqlite3.Error:
+                return None
+        return row[0] if row else None
+
+    def _WriteSchemaDigest(self):
+        """记录已应用的建表脚本指纹，不经过 GetCursor 以免重复触发延迟建表"""
+        with self._sqlite_lock:
+            self.GetConnection().execute(_SCHEMA_DIGEST_SAVE.replace("%s", "?"), (_SCHEMA_DIGEST,))
+
+    def _MigrateSchema(self):
+        """SQLite仅用于开发测试，不迁移旧表，表结构变化时直接重建数据库文件"""
+    
+    def _ApplySchema(self):
+        """执行由MySQL脚本转换而来的建表语句"""
+        self.ExecuteScript(";\n".join(_TranslateSchema(_SCHEMA_SCRIPT)) + ";")
@@ -270,7 +270,8 @@ async def list_files(
             file_type=file_type,
             search=search,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            include_preview=True
         )
         
         # 转换为响应模型
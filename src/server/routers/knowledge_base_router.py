@@ -7,6 +7,7 @@
 """
 
 import os
+import asyncio
 import logging
 from typing import List, Optional
 from datetime import datetime
@@ -83,15 +84,44 @@ class HealthCheckResponse(BaseModel):
     timestamp: str
 
 
+# 知识库计数对账间隔（秒），计数由文件增删改增量维护，定期按文件表重新统计以修正偏差；0表示不对账
+KB_COUNT_RECONCILE_INTERVAL = float(os.getenv("KB_COUNT_RECONCILE_INTERVAL", "3600"))
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+async def reconcile_counts_periodically(interval: float):
+    """启动后立即对账一次，之后每隔 interval 秒对账一次"""
+    while True:
+        try:
+            fixed = await asyncio.to_thread(KnowledgeBase.Reconcile)
+            if fixed:
+                logger.info(f"知识库计数对账完成，修正了 {fixed} 个知识库")
+        except Exception as e:
+            logger.error(f"知识库计数对账失败: {e}")
+        await asyncio.sleep(interval)
+
+
 @router.on_event("startup")
 async def startup_event():
-    """应用启动时初始化数据库"""
-    try:
-        db_connection.InitializeTables()
-        logger.info("知识库数据库初始化完成")
-    except Exception as e:
-        logger.error(f"知识库数据库初始化失败: {e}")
-        raise
+    """应用启动时初始化数据库，并在后台定期对账知识库计数"""
+    global _reconcile_task
+    if not db_connection.lazy_init_tables:
+        # 延迟建表时推迟到第一次数据库访问
+        try:
+            db_connection.InitializeTables()
+            logger.info("知识库数据库初始化完成")
+        except Exception as e:
+            logger.error(f"知识库数据库初始化失败: {e}")
+            raise
+    if KB_COUNT_RECONCILE_INTERVAL > 0:
+        _reconcile_task = asyncio.create_task(reconcile_counts_periodically(KB_COUNT_RECONCILE_INTERVAL))
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    """停止后台对账任务"""
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
 
 
 @router.get("/health", response_model=HealthCheckResponse)
@@ -99,7 +129,7 @@ async def health_check():
     """健康检查接口"""
     try:
         # 检查数据库连接
-        db_connection.ExecuteQuery("SELECT 1")
+        await db_connection.ExecuteQueryAsync("SELECT 1")
         db_status = "connected"
     except Exception as e:
         logger.error(f"数据库连接失败: {e}")
@@ -192,7 +222,7 @@ async def GetKnowledgeBase(kb_id: str):
             raise HTTPException(status_code=404, detail="知识库不存在")
         
         # 获取该知识库下的文件列表
-        files = FileDocument.GetByKnowledgeBase(kb_id, limit=10)
+        files = FileDocument.GetByKnowledgeBase(kb_id, limit=10, include_metadata=True)
         
         return {
             "success": True, 
@@ -382,6 +412,13 @@ async def upload_file(
             suffix=file_suffix,
             metadata=metadata
         )
+        if doc is None:
+            # 数据库记录未能创建，清理已上传到MinIO的文件
+            try:
+                file_service.delete_file(file_path, bucket_name="knowledge-base")
+            except Exception as e:
+                logger.warning(f"从MinIO删除文件失败: {file_path}, 错误: {e}")
+            raise HTTPException(status_code=500, detail="文件记录创建失败")
         
         return FileUploadResponse(
             success=True,
@@ -425,13 +462,15 @@ async def GetFiles(
             sort_by=sort_by or "uploaded_at",
             sort_order=sort_order or "desc",
             knowledge_base_id=knowledge_base_id,
-            file_ids=file_ids_list
+            file_ids=file_ids_list,
+            include_metadata=True
         )
         # Python层过滤已移除
         
         # 获取总数
         total_files = FileDocument.GetAll(limit=10000, status=status, file_type=file_type, search=search, knowledge_base_id=knowledge_base_id, file_ids=file_ids_list)
         total = len(total_files)
+        FileDocument.LoadMetadata(files)
         
         return FileListResponse(
             files=[f.ToDict() for f in files],
@@ -544,43 +583,66 @@ async def BatchVectorizeFiles(request: BatchVectorizeRequest):
     """批量向量化文件"""
     try:
         results = []
-        for file_id in request.file_ids:
-            try:
-                doc = FileDocument.GetById(file_id)
-                if not doc:
-                    results.append({"file_id": file_id, "status": "failed", "message": "文件不存在"})
-                    continue
-                
-                if doc.status == "vectorized":
-                    results.append({"file_id": file_id, "status": "skipped", "message": "文件已经向量化"})
-                    continue
-                
-                if doc.status == "processing":
-                    results.append({"file_id": file_id, "status": "skipped", "message": "文件正在处理中"})
-                    continue
-                
-                # 更新状态为处理中
-                doc.UpdateStatus("processing")
-                
-                # 向量化过程
-                vector_documents(file_ids=[file_id],knowledge_base_id=request.knowledge_base_id)
-                
-                # 向量化结果
-                vector_count = 100 + (doc.size // 1000)
-                success = doc.UpdateVectorization(vector_count)
-                
-                if success:
-                    results.append({
-                        "file_id": file_id, 
-                        "status": "success", 
-                        "message": "向量化成功",
-                        "vector_count": vector_count
-                    })
-                else:
-                    results.append({"file_id": file_id, "status": "failed", "message": "向量化失败"})
+        # 向量化成功的文件最后一次性写回，file_id -> (结果下标, 向量数量)
+        vectorized = {}
+        # 已标记为处理中、尚未写回结果的文件，file_id -> 文件文档
+        processing = {}
+        # 一次查询取回全部文件，避免逐个查询
+        docs = FileDocument.GetByIds(request.file_ids)
+        try:
+            for file_id in request.file_ids:
+                try:
+                    doc = docs.get(file_id)
+                    if not doc:
+                        results.append({"file_id": file_id, "status": "failed", "message": "文件不存在"})
+                        continue
                     
-            except Exception as e:
-                results.append({"file_id": file_id, "status": "failed", "message": str(e)})
+                    if doc.status == "vectorized":
+                        results.append({"file_id": file_id, "status": "skipped", "message": "文件已经向量化"})
+                        continue
+                    
+                    if doc.status == "processing":
+                        results.append({"file_id": file_id, "status": "skipped", "message": "文件正在处理中"})
+                        continue
+                    
+                    # 更新状态为处理中
+                    doc.UpdateStatus("processing")
+                    processing[file_id] = doc
+                    
+                    # 向量化过程
+                    vector_documents(file_ids=[file_id],knowledge_base_id=request.knowledge_base_id)
+                    
+                    # 向量化结果
+                    vector_count = 100 + (doc.size // 1000)
+                    vectorized[file_id] = (len(results), vector_count)
+                    results.append(None)
+                        
+                except Exception as e:
+                    failed = processing.pop(file_id, None)
+                    if failed is not None:
+                        failed.UpdateStatus("failed", str(e))
+                    results.append({"file_id": file_id, "status": "failed", "message": str(e)})
+            
+            if vectorized:
+                success = FileDocument.UpdateVectorizationBulk(
+                    [(file_id, vector_count) for file_id, (_, vector_count) in vectorized.items()]
+                )
+                for file_id, (index, vector_count) in vectorized.items():
+                    if success:
+                        processing.pop(file_id, None)
+                        results[index] = {
+                            "file_id": file_id, 
+                            "status": "success", 
+                            "message": "向量化成功",
+                            "vector_count": vector_count
+                        }
+                    else:
+                        results[index] = {"file_id": file_id, "status": "failed", "message": "向量化失败"}
+        finally:
+            # 结果未能写回（批量写入失败或请求中途中断）的文件标记为失败，
+            # 否则它们会一直停留在处理中，之后的请求都会跳过
+            for doc in processing.values():
+                doc.UpdateStatus("failed", "向量化结果写入失败")
         
         return {
             "success": True,
@@ -628,11 +690,10 @@ async def GetStats():
     """获取知识库统计信息"""
     try:
         knowledge_bases = KnowledgeBase.GetAll()
-        files = FileDocument.GetAll(limit=10000)
         
         total_kbs = len(knowledge_bases)
-        total_files = len(files)
-        total_vectors = sum(f.vector_count for f in files)
+        total_files = 0
+        total_vectors = 0
         
         # 按状态统计
         kb_status_stats = {}
@@ -642,15 +703,23 @@ async def GetStats():
         for kb in knowledge_bases:
             kb_status_stats[kb.status] = kb_status_stats.get(kb.status, 0) + 1
         
-        for file in files:
+        # 流式遍历全部文件，按上传时间倒序，前5个即最近上传的文件
+        recent_file_ids = []
+        for file in FileDocument.IterAll(sort_by="uploaded_at", sort_order="desc"):
+            total_files += 1
+            total_vectors += file.vector_count
             file_status_stats[file.status] = file_status_stats.get(file.status, 0) + 1
             
             # 文件类型统计
             file_type = file.type.split('/')[-1].upper()
             file_type_stats[file_type] = file_type_stats.get(file_type, 0) + 1
+            
+            if len(recent_file_ids) < 5:
+                recent_file_ids.append(file.id)
         
-        # 最近上传的文件
-        recent_files = sorted(files, key=lambda x: x.uploaded_at, reverse=True)[:5]
+        # 最近上传的文件，重新取回包含元数据的完整记录
+        recent_docs = FileDocument.GetByIds(recent_file_ids)
+        recent_files = [recent_docs[file_id] for file_id in recent_file_ids if file_id in recent_docs]
         
         return {
             "success": True,
@@ -0,0 +1,21 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+# 先加载 connection 模块，由其按 IASMIND_DB_BACKEND 导入 sqlite_connection
+import src.database.connection  # noqa: F401
+from src.database import models
+from src.database.sqlite_connection import SqliteConnection
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """模型类改用内存SQLite数据库"""
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", ":memory:")
+    monkeypatch.setenv("MYSQL_LAZY_INIT_TABLES", "false")
+    connection = SqliteConnection()
+    connection.InitializeTables()
+    monkeypatch.setattr(models, "db_connection", connection)
+    yield connection
+    connection.CloseConnection()
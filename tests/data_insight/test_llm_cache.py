@@ -0,0 +1,58 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import os
+import stat
+import tempfile
+import time
+
+from src.data_insight.llm_cache import DiskCacheBackend, LLMCache
+
+
+def test_cache_key_only_for_deterministic_calls():
+    assert LLMCache.cache_key("model", [("human", "hi")], 0.7) is None
+    assert LLMCache.cache_key("model", [("human", "hi")], 0) == LLMCache.cache_key("model", [("human", "hi")], 0)
+
+
+def test_default_dir_is_private_and_not_shared_tmp(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    backend = DiskCacheBackend()
+    assert not backend.cache_dir.startswith(tempfile.gettempdir() + os.sep + "iasmind")
+    assert backend.enabled
+    assert stat.S_IMODE(os.stat(backend.cache_dir).st_mode) == 0o700
+
+
+def test_existing_dir_open_to_other_users_is_tightened(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(mode=0o777)
+    os.chmod(cache_dir, 0o777)
+    backend = DiskCacheBackend(str(cache_dir))
+    assert backend.enabled
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path / "cache"), ttl=60)
+    backend.set("ab01", "report")
+    assert backend.get("ab01") == "report"
+    backend.ttl = -1
+    assert backend.get("ab01") is None
+    assert not os.path.exists(backend._path("ab01"))
+
+
+def test_oldest_entries_evicted_over_size_limit(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path / "cache"), max_entries=2)
+    now = time.time()
+    for age, key in ((30, "aa01"), (20, "bb02")):
+        backend.set(key, key)
+        os.utime(backend._path(key), (now - age, now - age))
+    backend.set("cc03", "cc03")
+    assert backend.get("aa01") is None
+    assert backend.get("bb02") == "bb02" and backend.get("cc03") == "cc03"
+
+
+def test_zero_size_disables_cache(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path / "cache"), max_entries=0)
+    backend.set("ab01", "report")
+    assert backend.get("ab01") is None
@@ -0,0 +1,36 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+from src.database.connection import _GroupSchemaStatements, _SCHEMA_GROUPS, _SCHEMA_SCRIPT
+
+
+def test_group_schema_statements_by_foreign_keys():
+    script = """
+    -- 注释行不参与分组
+    CREATE TABLE IF NOT EXISTS a (id INT);
+    CREATE TABLE IF NOT EXISTS b (id INT);
+    CREATE TABLE IF NOT EXISTS c (a_id INT, FOREIGN KEY (a_id) REFERENCES a(id));
+    CREATE TABLE d (a_id INT, b_id INT, FOREIGN KEY (a_id) REFERENCES a(id), FOREIGN KEY (b_id) REFERENCES `b`(id));
+    CREATE TABLE IF NOT EXISTS e (id INT);
+    """
+    groups = _GroupSchemaStatements(script)
+    assert len(groups) == 2
+    merged, independent = groups
+    # d 同时依赖 a 和 b 所在的组，两组合并且依赖的表排在前面
+    a, b, c, d = (merged.index(f" {name} (") for name in "abcd")
+    assert a < c < d and b < d
+    assert "EXISTS e" in independent and "注释" not in merged
+
+
+def test_group_schema_statements_keeps_script_serial_for_other_statements():
+    script = """
+    SET FOREIGN_KEY_CHECKS = 0;
+    CREATE TABLE IF NOT EXISTS a (id INT);
+    CREATE INDEX idx_a ON a (id);
+    """
+    assert _GroupSchemaStatements(script) == (script,)
+
+
+def test_shipped_schema_groups_cover_every_statement():
+    statements = [stmt for stmt in _SCHEMA_SCRIPT.split(";") if "CREATE TABLE" in stmt.upper()]
+    assert sum(group.count(";") for group in _SCHEMA_GROUPS) == len(statements)
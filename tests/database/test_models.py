@@ -0,0 +1,56 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+from src.database.models import FileDocument, KnowledgeBase
+
+
+def _counts(db, kb_id):
+    row = db.ExecuteQuery("SELECT file_count, vector_count FROM knowledge_bases WHERE id = %s", (kb_id,))[0]
+    return row["file_count"], row["vector_count"]
+
+
+def _create_file(kb, name):
+    return FileDocument.Create(name, "text/plain", 10, kb.id, f"kb/{name}")
+
+
+def test_file_mutations_adjust_knowledge_base_counts(db):
+    kb = KnowledgeBase.Create("kb")
+    a = _create_file(kb, "a.txt")
+    b = _create_file(kb, "b.txt")
+    FileDocument.CreateMany([
+        {"name": "c.txt", "file_type": "text/plain", "size": 1, "knowledge_base_id": kb.id, "file_path": "kb/c.txt"},
+    ])
+    assert _counts(db, kb.id) == (3, 0)
+    
+    assert a.UpdateVectorization(5)
+    assert FileDocument.UpdateVectorizationBulk([(a.id, 7), (b.id, 4)])
+    assert _counts(db, kb.id) == (3, 11)
+    
+    assert b.Delete()
+    assert _counts(db, kb.id) == (2, 7)
+
+
+def test_reconcile_repairs_count_drift(db):
+    kb = KnowledgeBase.Create("kb")
+    other = KnowledgeBase.Create("other")
+    _create_file(kb, "a.txt").UpdateVectorization(3)
+    KnowledgeBase.AdjustCounts(kb.id, file_delta=5, vector_delta=-2)
+    KnowledgeBase.AdjustCounts(other.id, file_delta=1)
+    
+    KnowledgeBase.Reconcile(kb.id)
+    assert _counts(db, kb.id) == (1, 3)
+    assert _counts(db, other.id) == (1, 0)
+    
+    KnowledgeBase.Reconcile()
+    assert _counts(db, other.id) == (0, 0)
+
+
+def test_create_returns_none_when_insert_fails(db):
+    kb = KnowledgeBase.Create("kb")
+    # 知识库不存在时外键约束使插入失败，事务整体回滚
+    assert FileDocument.Create("a.txt", "text/plain", 1, "missing", "kb/a.txt") is None
+    assert FileDocument.CreateMany([
+        {"name": "b.txt", "file_type": "text/plain", "size": 1, "knowledge_base_id": "missing", "file_path": "kb/b.txt"},
+    ]) == []
+    assert db.ExecuteQuery("SELECT COUNT(*) AS n FROM file_documents") == [{"n": 0}]
+    assert _counts(db, kb.id) == (0, 0)
@@ -0,0 +1,116 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.database.connection import Cursor
+from src.database.sqlite_connection import SqliteConnection, _TranslateSchema
+
+
+@pytest.fixture
+def sqlite_connection(monkeypatch):
+    """直接构造的内存SQLite连接，默认不延迟建表"""
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", ":memory:")
+    monkeypatch.setenv("MYSQL_LAZY_INIT_TABLES", "false")
+    connections = []
+
+    def create(lazy_init_tables: bool = False):
+        monkeypatch.setenv("MYSQL_LAZY_INIT_TABLES", "true" if lazy_init_tables else "false")
+        connection = SqliteConnection()
+        connections.append(connection)
+        return connection
+
+    yield create
+    for connection in connections:
+        connection.CloseConnection()
+
+
+def test_translate_schema_rewrites_mysql_only_syntax():
+    statements = _TranslateSchema("""
+    -- 示例表
+    CREATE TABLE IF NOT EXISTS items (
+        id VARCHAR(36) PRIMARY KEY,
+        status ENUM('a', 'b') DEFAULT 'a',
+        payload JSON,
+        enabled TINYINT(1) DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_status (status),
+        INDEX idx_status_updated (status, updated_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+    table, *indexes = statements
+    assert "ENUM" not in table and "JSON" not in table and "TINYINT" not in table
+    assert "ON UPDATE" not in table and "ENGINE" not in table and "INDEX" not in table
+    assert table.rstrip().endswith(")") and ",\n)" not in table.replace(" ", "")
+    assert indexes == [
+        "CREATE INDEX IF NOT EXISTS items_idx_status ON items (status)",
+        "CREATE INDEX IF NOT EXISTS items_idx_status_updated ON items (status, updated_at)",
+    ]
+    # 转换结果可直接在SQLite中执行
+    db = sqlite3.connect(":memory:")
+    for stmt in statements:
+        db.execute(stmt)
+
+
+def test_initialize_tables_creates_shipped_schema(sqlite_connection):
+    connection = sqlite_connection()
+    connection.InitializeTables()
+    tables = {row["name"] for row in connection.ExecuteQuery("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"knowledge_bases", "file_documents", "file_exploration", "_schema_meta"} <= tables
+    # 指纹已记录，再次初始化直接跳过
+    assert connection._ReadSchemaDigest() is not None
+    connection.InitializeTables()
+
+
+def test_cursor_adapts_placeholders_rows_and_for_update(sqlite_connection):
+    connection = sqlite_connection()
+    connection.InitializeTables()
+    connection.ExecuteUpdate(
+        "INSERT INTO knowledge_bases (id, name, created_at) VALUES (%s, %s, NOW())", ("kb", "name")
+    )
+    rows = connection.ExecuteQuery("SELECT id, name FROM knowledge_bases WHERE id = %s FOR UPDATE", ("kb",))
+    assert rows == [{"id": "kb", "name": "name"}]
+    with connection.GetCursor(Cursor) as cursor:
+        cursor.execute("SELECT id, created_at FROM knowledge_bases")
+        (row,) = cursor.fetchall()
+    assert row[0] == "kb" and row[1] is not None
+
+
+def test_transaction_cursor_rolls_back_on_error(sqlite_connection):
+    connection = sqlite_connection()
+    connection.InitializeTables()
+    with pytest.raises(RuntimeError):
+        with connection.TransactionCursor() as cursor:
+            cursor.execute("INSERT INTO knowledge_bases (id, name) VALUES (%s, %s)", ("kb", "name"))
+            raise RuntimeError("中断事务")
+    assert connection.ExecuteQuery("SELECT COUNT(*) AS n FROM knowledge_bases") == [{"n": 0}]
+
+
+def test_lazy_init_tables_first_query_does_not_deadlock(sqlite_connection):
+    """延迟建表时第一次查询会在持有 _init_lock 的情况下写入建表指纹，不能再次进入 EnsureTables"""
+    connection = sqlite_connection(lazy_init_tables=True)
+    result = {}
+
+    def run():
+        result["rows"] = connection.ExecuteQuery("SELECT COUNT(*) AS n FROM knowledge_bases")
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "第一次查询在延迟建表时卡住"
+    assert result["rows"] == [{"n": 0}]
+    assert connection._tables_initialized
+    assert connection._ReadSchemaDigest() is not None
+
+
+def test_cached_query_accepts_list_params(sqlite_connection):
+    """CachedQuery 与 ExecuteQuery 一样接受列表形式的参数，列表与元组命中同一缓存"""
+    connection = sqlite_connection()
+    connection.InitializeTables()
+    sql = "SELECT COUNT(*) AS n FROM knowledge_bases WHERE id = %s"
+    rows = connection.CachedQuery(sql, ["missing"])
+    assert rows == [{"n": 0}]
+    assert connection.CachedQuery(sql, ("missing",)) is rows
@@ -0,0 +1,54 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+import pytest
+
+from src.database.models import FileDocument, KnowledgeBase
+
+router = pytest.importorskip(
+    "src.server.routers.knowledge_base_router", reason="需要完整安装服务端依赖"
+)
+
+
+def _statuses(db, ids):
+    placeholders = ", ".join(["%s"] * len(ids))
+    rows = db.ExecuteQuery(f"SELECT id, status FROM file_documents WHERE id IN ({placeholders})", tuple(ids))
+    return {row["id"]: row["status"] for row in rows}
+
+
+def _vectorize(file_ids, kb_id):
+    request = router.BatchVectorizeRequest(file_ids=file_ids, knowledge_base_id=kb_id)
+    return asyncio.run(router.BatchVectorizeFiles(request))
+
+
+def test_batch_vectorize_resets_files_when_bulk_write_fails(db, monkeypatch):
+    kb = KnowledgeBase.Create("kb")
+    ids = [FileDocument.Create(f"{name}.txt", "text/plain", 10, kb.id, f"kb/{name}.txt").id for name in "ab"]
+    monkeypatch.setattr(router, "vector_documents", lambda **kwargs: None)
+    bulk = FileDocument.UpdateVectorizationBulk
+    monkeypatch.setattr(FileDocument, "UpdateVectorizationBulk", classmethod(lambda cls, updates: False))
+    
+    response = _vectorize(ids, kb.id)
+    assert [result["status"] for result in response["results"]] == ["failed", "failed"]
+    assert set(_statuses(db, ids).values()) == {"failed"}
+    
+    # 写回失败的文件不会停留在处理中，重试时不会被跳过
+    monkeypatch.setattr(FileDocument, "UpdateVectorizationBulk", bulk)
+    response = _vectorize(ids, kb.id)
+    assert [result["status"] for result in response["results"]] == ["success", "success"]
+    assert set(_statuses(db, ids).values()) == {"vectorized"}
+
+
+def test_batch_vectorize_resets_file_when_vectorizing_raises(db, monkeypatch):
+    kb = KnowledgeBase.Create("kb")
+    doc = FileDocument.Create("a.txt", "text/plain", 10, kb.id, "kb/a.txt")
+    
+    def fail(**kwargs):
+        raise RuntimeError("向量库不可用")
+    
+    monkeypatch.setattr(router, "vector_documents", fail)
+    response = _vectorize([doc.id], kb.id)
+    assert response["results"] == [{"file_id": doc.id, "status": "failed", "message": "向量库不可用"}]
+    assert _statuses(db, [doc.id]) == {doc.id: "failed"}